@@ -0,0 +1,159 @@
+"""Benchmark of the cgroup stats reader against the engine stats API.
+
+Builds a fake cgroup v2 (or v1) and /proc tree for the containers, then reports
+for growing container counts the time to get a stats frame of every container:
+
+- cgroup: CgroupReader.read_all, in one executor job
+- api: one-shot stats requests to the fake engine, 10 in parallel, for the
+  running ones (about 90%)
+
+with the wall time and the CPU time of this process. The fake engine frames are
+smaller than real ones and it doesn't wait to fill precpu_stats, so the API
+numbers are a lower bound.
+
+Run from the repository root with:
+
+    python -m benchmarks.bench_cgroup --containers 50 200 1000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+from pathlib import Path
+import random
+import statistics
+import tempfile
+import time
+from typing import Any
+
+from custom_components.docker_monitor.cgroup import CgroupReader
+from custom_components.docker_monitor.engine import DockerEngineClient
+
+from .bench_coordinator import fake_engine
+
+HEADER = f"{'ctrs':>6} {'backend':>8} {'wall ms':>9} {'cpu ms':>9}"
+
+NET_DEV = """\
+Inter-|   Receive                                                |  Transmit
+ face |bytes    packets errs drop fifo frame compressed multicast|bytes    packets errs drop fifo colls carrier compressed
+    lo:       0       0    0    0    0     0          0         0        0       0    0    0    0     0       0          0
+  eth0: {rx} {rxp} 0 0 0 0 0 0 {tx} {txp} 0 0 0 0 0 0
+"""
+
+
+def build_tree(root: Path, containers: int, v2: bool = True) -> list[dict[str, Any]]:
+    """Create the fake sysfs and proc trees, returning the inspect data."""
+    sys_root = root / "sys"
+    proc = root / "proc"
+    sys_root.mkdir(parents=True)
+    proc.mkdir()
+    (proc / "stat").write_text(
+        "cpu  1000 0 500 100000 0 0 0 0 0 0\n"
+        + "".join(f"cpu{i} 100 0 50 10000 0 0 0 0 0 0\n" for i in range(8))
+    )
+    (proc / "meminfo").write_text("MemTotal:       16000000 kB\n")
+    if v2:
+        (sys_root / "cgroup.controllers").write_text("cpu memory io pids\n")
+
+    inspected = []
+    for index in range(containers):
+        container_id = f"{index:064x}"
+        pid = 1000 + index
+        cgroup = f"system.slice/docker-{container_id}.scope"
+        (proc / str(pid) / "net").mkdir(parents=True)
+        rx, tx = random.randint(0, 10**9), random.randint(0, 10**9)
+        (proc / str(pid) / "net" / "dev").write_text(
+            NET_DEV.format(rx=rx, rxp=rx // 1000, tx=tx, txp=tx // 1000)
+        )
+        usage = random.randint(10**6, 10**9)
+        if v2:
+            (proc / str(pid) / "cgroup").write_text(f"0::/{cgroup}\n")
+            directory = sys_root / cgroup
+            directory.mkdir(parents=True)
+            (directory / "cpu.stat").write_text(
+                f"usage_usec {random.randint(0, 10**9)}\nuser_usec 0\nsystem_usec 0\n"
+            )
+            (directory / "memory.current").write_text(f"{usage}\n")
+            (directory / "memory.max").write_text("max\n")
+            (directory / "memory.stat").write_text(
+                f"anon {usage // 2}\nfile {usage // 2}\ninactive_file {usage // 4}\n"
+            )
+        else:
+            (proc / str(pid) / "cgroup").write_text(
+                f"4:cpu,cpuacct:/{cgroup}\n3:memory:/{cgroup}\n"
+            )
+            cpu = sys_root / "cpuacct" / cgroup
+            memory = sys_root / "memory" / cgroup
+            cpu.mkdir(parents=True)
+            memory.mkdir(parents=True)
+            (cpu / "cpuacct.usage").write_text(f"{random.randint(0, 10**12)}\n")
+            (memory / "memory.usage_in_bytes").write_text(f"{usage}\n")
+            (memory / "memory.limit_in_bytes").write_text("9223372036854771712\n")
+            (memory / "memory.stat").write_text(
+                f"cache {usage // 2}\ntotal_inactive_file {usage // 4}\n"
+            )
+        inspected.append({"Id": container_id, "State": {"Pid": pid}})
+    return inspected
+
+
+async def measure(func: Any, rounds: int) -> tuple[float, float]:
+    """Return the median wall and CPU time of func, in seconds."""
+    walls, cpus = [], []
+    for _ in range(rounds):
+        wall, cpu = time.perf_counter(), time.process_time()
+        await func()
+        walls.append(time.perf_counter() - wall)
+        cpus.append(time.process_time() - cpu)
+    return statistics.median(walls), statistics.median(cpus)
+
+
+async def run(containers: int, rounds: int, v2: bool) -> None:
+    """Benchmark one container count."""
+    loop = asyncio.get_running_loop()
+    with tempfile.TemporaryDirectory() as tmp:
+        inspected = build_tree(Path(tmp), containers, v2)
+        reader = CgroupReader(os.path.join(tmp, "sys"), os.path.join(tmp, "proc"))
+
+        async def cgroup() -> None:
+            frames = await loop.run_in_executor(None, reader.read_all, inspected)
+            assert all(frames.values())
+
+        wall, cpu = await measure(cgroup, rounds)
+        print(f"{containers:>6} {'cgroup':>8} {wall * 1000:>9.1f} {cpu * 1000:>9.1f}")
+
+    async with fake_engine(containers) as socket:
+        client = DockerEngineClient(f"unix://{socket}")
+        ids = [c["Id"] for c in await client.containers(all_=False)]
+        semaphore = asyncio.Semaphore(10)
+
+        async def stats(container_id: str) -> None:
+            async with semaphore:
+                await client.stats(container_id, one_shot=True)
+
+        async def api() -> None:
+            await asyncio.gather(*(stats(container_id) for container_id in ids))
+
+        wall, cpu = await measure(api, rounds)
+        print(f"{len(ids):>6} {'api':>8} {wall * 1000:>9.1f} {cpu * 1000:>9.1f}")
+        await client.close()
+
+
+async def main(args: argparse.Namespace) -> None:
+    """Run all benchmarks."""
+    print(HEADER)
+    for containers in args.containers:
+        await run(containers, args.rounds, not args.v1)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--containers", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--v1", action="store_true", help="fake a cgroup v1 host")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,291 @@
+"""Load benchmarks of DockerMonitorCoordinator against the fake engine.
+
+For each container count, starts the fake engine in a separate process, runs
+the coordinator in this one and reports:
+
+- refresh latency (median and max over the measured refreshes)
+- event loop blocking (longest and total lag of a 10 ms ticker)
+- open sockets of this process
+- resident memory of this process
+- engine requests served, and the same during an event storm
+
+Needs Home Assistant installed (`pip install homeassistant`), run from the
+repository root with:
+
+    python -m benchmarks.bench_coordinator --containers 50 200 1000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import timedelta
+import logging
+import os
+from pathlib import Path
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import aiohttp
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import device_registry as dr, entity_registry as er
+
+from custom_components.docker_monitor.const import (
+    CONF_MAX_SAMPLE_INTERVAL,
+    CONF_MAX_STATS_REQUESTS,
+    CONF_MIN_SAMPLE_INTERVAL,
+    CONF_STATS_MODE,
+    STATS_MODE_ONE_SHOT,
+    STATS_MODE_STREAM,
+)
+from custom_components.docker_monitor.coordinator import DockerMonitorCoordinator
+
+TICK = 0.01
+# seconds between two measured refreshes
+REFRESH_INTERVAL = 1.0
+# sample every container on each refresh, otherwise the sampling scheduler caps
+# and spaces the one-shot stats requests whatever the container count
+SAMPLE_EVERY_REFRESH = {
+    CONF_MIN_SAMPLE_INTERVAL: REFRESH_INTERVAL / 2,
+    CONF_MAX_SAMPLE_INTERVAL: REFRESH_INTERVAL / 2,
+    CONF_MAX_STATS_REQUESTS: 0,
+}
+
+
+@dataclass
+class Result:
+    """Measures of one run."""
+
+    containers: int
+    mode: str
+    setup: float
+    refresh_median: float
+    refresh_max: float
+    lag_max: float
+    lag_total: float
+    sockets: int
+    rss_mib: float
+    requests: int
+    storm_requests: int | None = None
+    storm_lag_max: float | None = None
+
+    def row(self) -> str:
+        """Format as a table row."""
+        storm = (
+            f"{self.storm_requests:>9} {self.storm_lag_max * 1000:>9.1f}"
+            if self.storm_requests is not None
+            else f"{'-':>9} {'-':>9}"
+        )
+        return (
+            f"{self.containers:>6} {self.mode:>8} {self.setup:>8.2f}"
+            f" {self.refresh_median * 1000:>9.1f} {self.refresh_max * 1000:>9.1f}"
+            f" {self.lag_max * 1000:>8.1f} {self.lag_total * 1000:>9.1f}"
+            f" {self.sockets:>7} {self.rss_mib:>7.1f} {self.requests:>8} {storm}"
+        )
+
+
+HEADER = (
+    f"{'ctrs':>6} {'mode':>8} {'setup s':>8} {'refr ms':>9} {'refr max':>9}"
+    f" {'lag max':>8} {'lag total':>9} {'sockets':>7} {'RSS MiB':>7} {'requests':>8}"
+    f" {'storm req':>9} {'storm lag':>9}"
+)
+
+
+class LagMonitor:
+    """Measure how long the event loop is blocked, using a ticker task."""
+
+    def __init__(self) -> None:
+        """Init."""
+        self.max = 0.0
+        self.total = 0.0
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """Start measuring."""
+        self.max = self.total = 0.0
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self) -> None:
+        """Stop measuring."""
+        if self._task:
+            self._task.cancel()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + TICK
+            await asyncio.sleep(TICK)
+            lag = max(0.0, loop.time() - expected)
+            self.max = max(self.max, lag)
+            self.total += lag
+
+
+def open_sockets() -> int:
+    """Return the number of sockets opened by this process."""
+    fds = Path("/proc/self/fd")
+    count = 0
+    for fd in fds.iterdir():
+        try:
+            if os.readlink(fd).startswith("socket:"):
+                count += 1
+        except OSError:
+            continue
+    return count
+
+
+def rss_mib() -> float:
+    """Return the resident memory of this process."""
+    for line in Path("/proc/self/status").read_text().splitlines():
+        if line.startswith("VmRSS:"):
+            return int(line.split()[1]) / 1024
+    return 0.0
+
+
+@asynccontextmanager
+async def fake_engine(containers: int):
+    """Run the fake engine in another process, yielding its socket path."""
+    with tempfile.TemporaryDirectory() as tmp:
+        socket = os.path.join(tmp, "docker.sock")
+        process = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.fake_engine",
+                "--socket",
+                socket,
+                "--containers",
+                str(containers),
+            ]
+        )
+        try:
+            while not os.path.exists(socket):
+                await asyncio.sleep(0.05)
+            yield socket
+        finally:
+            process.terminate()
+            process.wait()
+
+
+async def engine_requests(session: aiohttp.ClientSession) -> int:
+    """Return the number of requests the fake engine served."""
+    async with session.get("http://localhost/_bench/counters") as resp:
+        counters: dict[str, int] = await resp.json()
+    return sum(v for k, v in counters.items() if not k.startswith("/_bench"))
+
+
+async def create_hass(config_dir: str) -> HomeAssistant:
+    """Create a bare Home Assistant instance."""
+    try:
+        hass = HomeAssistant(config_dir)  # type: ignore[call-arg]
+    except TypeError:
+        hass = HomeAssistant()
+    hass.config.config_dir = config_dir
+    await dr.async_load(hass)
+    await er.async_load(hass)
+    return hass
+
+
+async def run(
+    containers: int, mode: str, refreshes: int, storm: int, warmup: float
+) -> Result:
+    """Benchmark one container count in one stats mode."""
+    async with fake_engine(containers) as socket:
+        connector = aiohttp.UnixConnector(path=socket)
+        async with aiohttp.ClientSession(connector=connector) as control:
+            with tempfile.TemporaryDirectory() as config_dir:
+                hass = await create_hass(config_dir)
+                lag = LagMonitor()
+                lag.start()
+                coordinator = DockerMonitorCoordinator(
+                    hass,
+                    "bench",
+                    f"unix://{socket}",
+                    timedelta(seconds=30),
+                    {CONF_STATS_MODE: mode, **SAMPLE_EVERY_REFRESH},
+                )
+
+                start = time.perf_counter()
+                await coordinator.init()
+                setup = time.perf_counter() - start
+                await asyncio.sleep(warmup)
+
+                durations = []
+                for _ in range(refreshes):
+                    start = time.perf_counter()
+                    await coordinator.async_refresh()
+                    durations.append(time.perf_counter() - start)
+                    await asyncio.sleep(REFRESH_INTERVAL)
+                result = Result(
+                    containers=containers,
+                    mode=mode,
+                    setup=setup,
+                    refresh_median=statistics.median(durations),
+                    refresh_max=max(durations),
+                    lag_max=lag.max,
+                    lag_total=lag.total,
+                    sockets=open_sockets(),
+                    rss_mib=rss_mib(),
+                    requests=await engine_requests(control),
+                )
+
+                if storm:
+                    before = await engine_requests(control)
+                    lag.start()
+                    async with control.post(
+                        "http://localhost/_bench/storm", params={"count": storm}
+                    ) as resp:
+                        await resp.read()
+                    await asyncio.sleep(max(5.0, storm / 20))
+                    result.storm_requests = await engine_requests(control) - before
+                    result.storm_lag_max = lag.max
+
+                lag.stop()
+                await coordinator.async_stop()
+                await hass.async_stop(force=True)
+    return result
+
+
+async def main(args: argparse.Namespace) -> None:
+    """Run all benchmarks."""
+    print(HEADER)
+    for containers in args.containers:
+        for mode in args.modes:
+            result = await run(
+                containers, mode, args.refreshes, args.storm, args.warmup
+            )
+            print(result.row(), flush=True)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--containers", type=int, nargs="+", default=[50, 200, 1000, 2000]
+    )
+    parser.add_argument(
+        "--modes",
+        nargs="+",
+        default=[STATS_MODE_STREAM, STATS_MODE_ONE_SHOT],
+        choices=[STATS_MODE_STREAM, STATS_MODE_ONE_SHOT],
+    )
+    parser.add_argument("--refreshes", type=int, default=5)
+    parser.add_argument(
+        "--storm",
+        type=int,
+        default=40,
+        help="container create/start/stop/destroy cycles fired after the refreshes",
+    )
+    parser.add_argument(
+        "--warmup", type=float, default=3.0, help="seconds before measuring"
+    )
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,494 @@
+"""Stand-in Docker Engine API server for load benchmarks.
+
+Serves enough of the Engine API for the docker_monitor coordinator to run
+against thousands of simulated containers:
+
+- GET  /_ping, /version and /info
+- GET  /containers/json (name and label filters)
+- GET  /containers/{id}/json
+- GET  /containers/{id}/stats (stream and stream=false, with one-shot)
+- POST /containers/{id}/start|stop|restart|kill
+- GET  /events (type, event, container and label filters)
+- GET  /system/df (answering after df_delay seconds, like a busy engine)
+
+and a control API for the benchmarks:
+
+- POST /_bench/storm?count=N&rate=R  fire N create/start/stop/destroy cycles
+- GET  /_bench/counters              requests served per route
+
+Run standalone with:
+
+    python -m benchmarks.fake_engine --socket /tmp/fake-docker.sock --containers 1000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections import Counter, deque
+from datetime import datetime, timezone
+import hashlib
+import json
+import random
+import re
+import time
+from typing import Any
+
+from aiohttp import web
+
+STATS_INTERVAL = 1.0
+EVENTS_HISTORY = 10000
+API_VERSION = "1.43"
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f") + "123Z"
+
+
+def _has_label(labels: dict[str, str], label: str) -> bool:
+    """Return whether labels match a `key` or `key=value` label filter."""
+    key, has_value, value = label.partition("=")
+    return key in labels and (not has_value or labels[key] == value)
+
+
+def _container_id(name: str) -> str:
+    return hashlib.sha256(name.encode()).hexdigest()
+
+
+class FakeContainer:
+    """A simulated container."""
+
+    def __init__(self, name: str, running: bool = True) -> None:
+        """Init."""
+        self.id = _container_id(name)
+        self.name = name
+        self.running = running
+        self.started_at = _now() if running else "0001-01-01T00:00:00Z"
+        self.created = int(time.time())
+        self.labels = {
+            "com.docker.compose.project": f"project{int(self.id, 16) % 20}",
+            "com.docker.compose.service": name,
+        }
+        self.image = f"registry.local/{name}:latest"
+        # status of the health check, None without health check
+        self.health: str | None = None
+        self._cpu = 0
+        self._system = 0
+        self._rx = 0
+        self._tx = 0
+        self._load = random.uniform(0.001, 0.5)
+
+    @property
+    def status(self) -> str:
+        """Return the container status."""
+        return "running" if self.running else "exited"
+
+    def summary(self) -> dict[str, Any]:
+        """Return the /containers/json entry."""
+        return {
+            "Id": self.id,
+            "Names": [f"/{self.name}"],
+            "Image": self.image,
+            "Created": self.created,
+            "Labels": self.labels,
+            "State": self.status,
+            "Status": "Up" if self.running else "Exited (0)",
+        }
+
+    def inspect(self) -> dict[str, Any]:
+        """Return the /containers/{id}/json document."""
+        health = {"Health": {"Status": self.health}} if self.health else {}
+        return {
+            "Id": self.id,
+            "Name": f"/{self.name}",
+            "Created": _now(),
+            "RestartCount": 0,
+            "State": {
+                "Status": self.status,
+                "Running": self.running,
+                "Pid": 1000 + (self.created % 30000) if self.running else 0,
+                "ExitCode": 0,
+                "OOMKilled": False,
+                "StartedAt": self.started_at,
+                "FinishedAt": "0001-01-01T00:00:00Z",
+                **health,
+            },
+            "Config": {"Image": self.image, "Labels": self.labels},
+        }
+
+    def stats(self, with_precpu: bool) -> dict[str, Any]:
+        """Advance counters and return a stats frame."""
+        precpu = {
+            "cpu_usage": {"total_usage": self._cpu},
+            "system_cpu_usage": self._system,
+            "online_cpus": 8,
+        }
+        self._system += int(8e9 * STATS_INTERVAL)
+        self._cpu += int(8e9 * STATS_INTERVAL * self._load * random.uniform(0.8, 1.2))
+        self._rx += random.randint(0, 100000)
+        self._tx += random.randint(0, 50000)
+        cpu = {
+            "cpu_usage": {
+                "total_usage": self._cpu,
+                "usage_in_kernelmode": self._cpu // 4,
+                "usage_in_usermode": self._cpu // 2,
+            },
+            "system_cpu_usage": self._system,
+            "online_cpus": 8,
+            "throttling_data": {"periods": 0, "throttled_periods": 0},
+        }
+        return {
+            "read": _now(),
+            "preread": _now(),
+            "id": self.id,
+            "name": f"/{self.name}",
+            "pids_stats": {"current": 12, "limit": 4096},
+            "blkio_stats": {"io_service_bytes_recursive": []},
+            "num_procs": 0,
+            "storage_stats": {},
+            "cpu_stats": cpu,
+            "precpu_stats": precpu if with_precpu else {"cpu_usage": {}},
+            "memory_stats": {
+                "usage": 50_000_000 + random.randint(0, 5_000_000),
+                "limit": 8_000_000_000,
+                "stats": {"inactive_file": 1_000_000, "active_anon": 40_000_000},
+            },
+            "networks": {
+                "eth0": {
+                    "rx_bytes": self._rx,
+                    "tx_bytes": self._tx,
+                    "rx_packets": self._rx // 1000,
+                    "tx_packets": self._tx // 1000,
+                    "rx_errors": 0,
+                    "tx_errors": 0,
+                    "rx_dropped": 0,
+                    "tx_dropped": 0,
+                }
+            },
+        }
+
+
+class FakeEngine:
+    """The simulated engine."""
+
+    def __init__(self, containers: int, stopped_ratio: float = 0.1) -> None:
+        """Init."""
+        self.containers: dict[str, FakeContainer] = {}
+        for i in range(containers):
+            self._add(
+                FakeContainer(f"svc{i}", running=random.random() >= stopped_ratio)
+            )
+        self.counters: Counter[str] = Counter()
+        self._subscribers: list[asyncio.Queue] = []
+        self._history: deque[dict[str, Any]] = deque(maxlen=EVENTS_HISTORY)
+        self._storm_seq = 0
+        self.df_delay = 0.0
+
+    def _add(self, container: FakeContainer) -> None:
+        self.containers[container.id] = container
+
+    def _find(self, request: web.Request) -> FakeContainer:
+        key = request.match_info["id"]
+        container = self.containers.get(key)
+        if container is None:
+            container = next(
+                (c for c in self.containers.values() if c.name == key), None
+            )
+        if container is None:
+            raise web.HTTPNotFound(
+                text=json.dumps({"message": f"No such container: {key}"}),
+                content_type="application/json",
+            )
+        return container
+
+    def emit(self, action: str, container: FakeContainer) -> None:
+        """Publish a container event."""
+        now = time.time_ns()
+        event = {
+            "status": action,
+            "id": container.id,
+            "from": container.image,
+            "Type": "container",
+            "Action": action,
+            "Actor": {
+                "ID": container.id,
+                "Attributes": {
+                    "name": container.name,
+                    "image": container.image,
+                    **container.labels,
+                },
+            },
+            "scope": "local",
+            "time": now // 1_000_000_000,
+            "timeNano": now,
+        }
+        self._history.append(event)
+        for queue in self._subscribers:
+            queue.put_nowait(event)
+
+    def application(self) -> web.Application:
+        """Create the aiohttp application."""
+        app = web.Application()
+        app.middlewares.append(self._count)
+        app.router.add_get("/_ping", self.ping)
+        app.router.add_get("/version", self.version)
+        app.router.add_get("/info", self.info)
+        app.router.add_get("/containers/json", self.list_containers)
+        app.router.add_get("/containers/{id}/json", self.inspect)
+        app.router.add_get("/containers/{id}/stats", self.stats)
+        app.router.add_post("/containers/{id}/start", self.start)
+        app.router.add_post("/containers/{id}/stop", self.stop)
+        app.router.add_post("/containers/{id}/restart", self.restart)
+        app.router.add_post("/containers/{id}/kill", self.kill)
+        app.router.add_get("/events", self.events)
+        app.router.add_get("/system/df", self.disk_usage)
+        app.router.add_post("/_bench/storm", self.storm)
+        app.router.add_get("/_bench/counters", self.get_counters)
+        return app
+
+    @web.middleware
+    async def _count(self, request: web.Request, handler: Any) -> web.StreamResponse:
+        route = request.match_info.route.resource
+        self.counters[route.canonical if route else request.path] += 1
+        return await handler(request)
+
+    async def ping(self, request: web.Request) -> web.Response:
+        """GET /_ping."""
+        return web.Response(text="OK", headers={"Api-Version": API_VERSION})
+
+    async def version(self, request: web.Request) -> web.Response:
+        """GET /version."""
+        return web.json_response(
+            {"Version": "24.0.0", "ApiVersion": API_VERSION, "Os": "linux"}
+        )
+
+    async def info(self, request: web.Request) -> web.Response:
+        """GET /info."""
+        running = sum(c.running for c in self.containers.values())
+        return web.json_response(
+            {
+                "Containers": len(self.containers),
+                "ContainersRunning": running,
+                "ContainersStopped": len(self.containers) - running,
+                "CgroupVersion": "2",
+                "SecurityOptions": ["name=seccomp,profile=builtin", "name=cgroupns"],
+            }
+        )
+
+    async def list_containers(self, request: web.Request) -> web.Response:
+        """GET /containers/json, with the name and label filters."""
+        show_all = request.query.get("all") in ("1", "true", "True")
+        filters = json.loads(request.query.get("filters", "{}"))
+        names = [re.compile(name) for name in filters.get("name", [])]
+        labels = filters.get("label", [])
+        return web.json_response(
+            [
+                c.summary()
+                for c in self.containers.values()
+                if (show_all or c.running)
+                and (not names or any(name.search(f"/{c.name}") for name in names))
+                and all(_has_label(c.labels, label) for label in labels)
+            ]
+        )
+
+    async def inspect(self, request: web.Request) -> web.Response:
+        """GET /containers/{id}/json."""
+        return web.json_response(self._find(request).inspect())
+
+    async def stats(self, request: web.Request) -> web.StreamResponse:
+        """GET /containers/{id}/stats."""
+        container = self._find(request)
+        if request.query.get("stream") in ("0", "false", "False"):
+            one_shot = request.query.get("one-shot") in ("1", "true", "True")
+            if not one_shot:
+                # the engine waits for a second sample to fill precpu_stats
+                await asyncio.sleep(STATS_INTERVAL)
+            return web.json_response(container.stats(with_precpu=not one_shot))
+
+        response = web.StreamResponse()
+        response.content_type = "application/json"
+        await response.prepare(request)
+        try:
+            while container.id in self.containers:
+                await response.write(
+                    json.dumps(container.stats(with_precpu=True)).encode() + b"\n"
+                )
+                await asyncio.sleep(STATS_INTERVAL)
+        except ConnectionResetError:
+            pass
+        return response
+
+    async def start(self, request: web.Request) -> web.Response:
+        """POST /containers/{id}/start."""
+        container = self._find(request)
+        container.running = True
+        container.started_at = _now()
+        self.emit("start", container)
+        return web.Response(status=204)
+
+    async def stop(self, request: web.Request) -> web.Response:
+        """POST /containers/{id}/stop."""
+        container = self._find(request)
+        container.running = False
+        self.emit("die", container)
+        self.emit("stop", container)
+        return web.Response(status=204)
+
+    async def kill(self, request: web.Request) -> web.Response:
+        """POST /containers/{id}/kill."""
+        container = self._find(request)
+        if not container.running:
+            raise web.HTTPConflict(
+                text=json.dumps(
+                    {"message": f"Container {container.id} is not running"}
+                ),
+                content_type="application/json",
+            )
+        container.running = False
+        self.emit("kill", container)
+        self.emit("die", container)
+        return web.Response(status=204)
+
+    async def restart(self, request: web.Request) -> web.Response:
+        """POST /containers/{id}/restart."""
+        container = self._find(request)
+        self.emit("die", container)
+        self.emit("stop", container)
+        container.running = True
+        container.started_at = _now()
+        self.emit("start", container)
+        self.emit("restart", container)
+        return web.Response(status=204)
+
+    async def events(self, request: web.Request) -> web.StreamResponse:
+        """GET /events."""
+        filters = json.loads(request.query.get("filters", "{}"))
+        since = request.query.get("since")
+        wanted = set(filters.get("event", []))
+        types = set(filters.get("type", []))
+        containers = set(filters.get("container", []))
+        labels = filters.get("label", [])
+
+        def match(event: dict[str, Any]) -> bool:
+            attributes = event["Actor"]["Attributes"]
+            return (
+                (not wanted or event["Action"].split(":")[0] in wanted)
+                and (not types or event["Type"] in types)
+                and (
+                    not containers
+                    or event["Actor"]["ID"] in containers
+                    or attributes["name"] in containers
+                )
+                and all(_has_label(attributes, label) for label in labels)
+            )
+
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.append(queue)
+        try:
+            response = web.StreamResponse()
+            response.content_type = "application/json"
+            await response.prepare(request)
+            if since is not None:
+                since_ns = int(float(since) * 1_000_000_000)
+                for event in list(self._history):
+                    if event["timeNano"] > since_ns and match(event):
+                        await response.write(json.dumps(event).encode() + b"\n")
+            while True:
+                event = await queue.get()
+                if match(event):
+                    await response.write(json.dumps(event).encode() + b"\n")
+        except ConnectionResetError:
+            return response
+        finally:
+            self._subscribers.remove(queue)
+
+    async def disk_usage(self, request: web.Request) -> web.Response:
+        """GET /system/df."""
+        await asyncio.sleep(self.df_delay)
+        return web.json_response(
+            {
+                "LayersSize": 100_000_000 * len(self.containers),
+                "Images": [
+                    {
+                        "Id": f"sha256:{i}",
+                        "Size": 100_000_000,
+                        "SharedSize": 0,
+                        "Containers": 1,
+                    }
+                    for i in range(len(self.containers))
+                ],
+                "Containers": [
+                    {"Id": c.id, "SizeRw": 1_000_000, "State": c.status}
+                    for c in self.containers.values()
+                ],
+                "Volumes": [
+                    {"Name": "data", "UsageData": {"Size": 5_000_000, "RefCount": 0}}
+                ],
+                "BuildCache": [],
+            }
+        )
+
+    async def storm(self, request: web.Request) -> web.Response:
+        """POST /_bench/storm, simulate `docker compose up/down` churn."""
+        count = int(request.query.get("count", 40))
+        rate = float(request.query.get("rate", 0))
+
+        async def run() -> None:
+            for _ in range(count):
+                self._storm_seq += 1
+                container = FakeContainer(f"storm{self._storm_seq}", running=False)
+                self._add(container)
+                self.emit("create", container)
+                container.running = True
+                container.started_at = _now()
+                self.emit("start", container)
+                container.running = False
+                self.emit("die", container)
+                self.emit("stop", container)
+                del self.containers[container.id]
+                self.emit("destroy", container)
+                if rate:
+                    await asyncio.sleep(1 / rate)
+
+        asyncio.get_running_loop().create_task(run())
+        return web.json_response({"count": count, "events": count * 5})
+
+    async def get_counters(self, request: web.Request) -> web.Response:
+        """GET /_bench/counters."""
+        return web.json_response(dict(self.counters))
+
+
+async def serve(
+    containers: int, socket: str | None = None, port: int | None = None
+) -> web.AppRunner:
+    """Start a fake engine listening on a unix socket or a TCP port."""
+    runner = web.AppRunner(FakeEngine(containers).application(), access_log=None)
+    await runner.setup()
+    site: web.BaseSite
+    if socket:
+        site = web.UnixSite(runner, socket)
+    else:
+        site = web.TCPSite(runner, "127.0.0.1", port or 2375)
+    await site.start()
+    return runner
+
+
+def main() -> None:
+    """Run the fake engine until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--containers", type=int, default=100)
+    parser.add_argument("--socket", help="unix socket path")
+    parser.add_argument("--port", type=int, help="TCP port (default 2375)")
+    args = parser.parse_args()
+
+    async def run() -> None:
+        await serve(args.containers, args.socket, args.port)
+        await asyncio.Event().wait()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -6,24 +6,37 @@ import logging
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import CONF_SCAN_INTERVAL, CONF_URL
 from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.typing import ConfigType
 
-from .const import COORDINATOR, DEFAULT_SCAN_INTERVAL, DOMAIN, PLATFORMS
+from .const import (
+    CONF_CAPABILITIES,
+    CONF_URLS,
+    DEFAULT_SCAN_INTERVAL,
+    DOMAIN,
+    HUB,
+    PLATFORMS,
+)
 from .coordinator import DockerMonitorCoordinator
+from .export import async_setup_export
+from .hub import STORAGE_VERSION, DockerMonitorHub, storage_key
+from .services import async_setup_services
 
 _LOGGER = logging.getLogger(__name__)
 
 
 async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
     """Set up the multimatic integration."""
+    async_setup_services(hass)
+    async_setup_export(hass)
     return True
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up monitor_docker from a config entry."""
     _LOGGER.debug(
-        "Setting up docker monitor integration with url %s, refresh rate %s, id is %s",
-        entry.data[CONF_URL],
+        "Setting up docker monitor integration with urls %s, refresh rate %s, id is %s",
+        entry.data[CONF_URLS],
         entry.options.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL),
         entry.entry_id,
     )
@@ -34,10 +47,17 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     scan_interval = timedelta(
         seconds=entry.options.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL)
     )
-    coord = DockerMonitorCoordinator(hass, entry.data[CONF_URL], scan_interval)
-    await coord.init()
-    await coord.async_config_entry_first_refresh()
-    hass.data[DOMAIN][entry.entry_id][COORDINATOR] = coord
+    hub = DockerMonitorHub(
+        hass,
+        entry.entry_id,
+        entry.data[CONF_URLS],
+        scan_interval,
+        entry.options,
+        entry.data.get(CONF_CAPABILITIES),
+    )
+    await hub.async_setup()
+    hass.data[DOMAIN][entry.entry_id][HUB] = hub
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
 
     for platform in PLATFORMS:
         hass.async_create_task(
@@ -47,6 +67,23 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     return True
 
 
+async def async_migrate_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    """Migrate old entry."""
+    if entry.version == 1:
+        # a single URL became a list of URLs
+        data = {**entry.data, CONF_URLS: [entry.data[CONF_URL]]}
+        data.pop(CONF_URL)
+        entry.version = 2
+        hass.config_entries.async_update_entry(entry, data=data)
+        _LOGGER.debug("Migrated entry %s to version 2", entry.entry_id)
+    return True
+
+
+async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload the config entry when options changed."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
 
@@ -58,6 +95,14 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
             )
         )
     )
+    if unload_ok:
+        hub: DockerMonitorHub = hass.data[DOMAIN].pop(entry.entry_id)[HUB]
+        await hub.async_stop()
     _LOGGER.debug("Remaining data for docker_monitor %s", hass.data[DOMAIN])
 
     return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the persisted state of a removed config entry."""
+    await Store(hass, STORAGE_VERSION, storage_key(entry.entry_id)).async_remove()
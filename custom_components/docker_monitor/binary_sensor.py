@@ -1,4 +1,5 @@
 """Docker monitor sensor."""
+from typing import Any
 
 from homeassistant.components.binary_sensor import (
     BinarySensorDeviceClass,
@@ -8,26 +9,35 @@ from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from . import COORDINATOR, DOMAIN as DOCKER_MONITOR, DockerMonitorCoordinator
-from .entities import DockerMonitorEntity
+from . import DOMAIN as DOCKER_MONITOR, HUB, DockerMonitorCoordinator, DockerMonitorHub
+from .const import FAMILY_HEALTH
+from .entities import DockerMonitorEntity, async_setup_container_entities
 
 
 async def async_setup_entry(
     hass: HomeAssistant, entry: ConfigEntry, async_add_entities: AddEntitiesCallback
 ) -> None:
     """Set up the docker monitor sensor."""
-    sensors: list[DockerMonitorEntity] = []
+    hub: DockerMonitorHub = hass.data[DOCKER_MONITOR][entry.entry_id][HUB]
+    async_setup_container_entities(
+        hass, entry, hub, async_add_entities, _create_binary_sensors
+    )
 
-    coordinator: DockerMonitorCoordinator = hass.data[DOCKER_MONITOR][entry.entry_id][
-        COORDINATOR
-    ]
 
-    for container_name, _data in coordinator.data.items():
-        sensors.extend(
-            (DockerMonitorStatusBinarySensor(coordinator, container_name, "status"),)
+def _create_binary_sensors(
+    coordinator: DockerMonitorCoordinator, container_name: str
+) -> list[DockerMonitorEntity]:
+    sensors: list[DockerMonitorEntity] = [
+        DockerMonitorStatusBinarySensor(coordinator, container_name, "status")
+    ]
+    if (
+        FAMILY_HEALTH in coordinator.families(container_name)
+        and coordinator.data[container_name].health is not None
+    ):
+        sensors.append(
+            DockerMonitorHealthBinarySensor(coordinator, container_name, "health")
         )
-
-    async_add_entities(sensors)
+    return sensors
 
 
 class DockerMonitorStatusBinarySensor(DockerMonitorEntity, BinarySensorEntity):
@@ -37,7 +47,7 @@ class DockerMonitorStatusBinarySensor(DockerMonitorEntity, BinarySensorEntity):
         self, coordinator: DockerMonitorCoordinator, container_name, key
     ) -> None:
         """Init."""
-        super().__init__(coordinator, container_name, key)
+        super().__init__(coordinator, container_name, key, key)
         self._key = key
 
     @property
@@ -48,7 +58,33 @@ class DockerMonitorStatusBinarySensor(DockerMonitorEntity, BinarySensorEntity):
     @property
     def is_on(self) -> bool | None:
         """Return true if the binary sensor is on."""
-        return (
-            self.coordinator.data.get(self._container_name, {}).get(self._key)
-            == "running"
-        )
+        snapshot = self._snapshot
+        return snapshot is not None and snapshot.status == "running"
+
+
+class DockerMonitorHealthBinarySensor(DockerMonitorEntity, BinarySensorEntity):
+    """Health check sensor, on when the container is unhealthy."""
+
+    def __init__(
+        self, coordinator: DockerMonitorCoordinator, container_name, key
+    ) -> None:
+        """Init."""
+        super().__init__(coordinator, container_name, key, key)
+        self._key = key
+
+    @property
+    def device_class(self) -> BinarySensorDeviceClass | None:
+        """Device class."""
+        return BinarySensorDeviceClass.PROBLEM
+
+    @property
+    def is_on(self) -> bool | None:
+        """Return true if the binary sensor is on."""
+        snapshot = self._snapshot
+        return snapshot is not None and snapshot.health == "unhealthy"
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        """Return the status of the health check."""
+        snapshot = self._snapshot
+        return {"status": snapshot.health} if snapshot else None
@@ -0,0 +1,72 @@
+"""Circuit breaker of the calls to a docker engine."""
+from __future__ import annotations
+
+import time
+
+# consecutive failed calls opening the circuit
+BREAKER_THRESHOLD = 5
+# seconds without calls once open, doubling on each failed probe up to the max
+BREAKER_COOLDOWN_MIN = 10
+BREAKER_COOLDOWN_MAX = 300
+
+
+class CircuitBreaker:
+    """Stop calling an engine which keeps failing, probing it after a cooldown.
+
+    Closed, calls are allowed. After threshold consecutive failures it opens and
+    calls are refused until the cooldown elapsed. Then it is half-open: calls
+    probing the engine are allowed, a success closes the circuit, a failure opens
+    it again for twice as long.
+    """
+
+    def __init__(
+        self,
+        threshold: int = BREAKER_THRESHOLD,
+        cooldown_min: float = BREAKER_COOLDOWN_MIN,
+        cooldown_max: float = BREAKER_COOLDOWN_MAX,
+    ) -> None:
+        """Init."""
+        self._threshold = threshold
+        self._cooldown_min = cooldown_min
+        self._cooldown_max = cooldown_max
+        self._cooldown = cooldown_min
+        self._failures = 0
+        # monotonic time until which calls are refused, None when closed
+        self._open_until: float | None = None
+
+    @property
+    def is_open(self) -> bool:
+        """Return whether the circuit is open or half-open."""
+        return self._open_until is not None
+
+    def retry_in(self, now: float | None = None) -> float:
+        """Return the seconds before the next probe, 0 when calls are allowed."""
+        if self._open_until is None:
+            return 0.0
+        return max(0.0, self._open_until - (time.monotonic() if now is None else now))
+
+    def allow(self, now: float | None = None) -> bool:
+        """Return whether a call can be made, closed or half-open."""
+        return self.retry_in(now) == 0
+
+    def success(self) -> None:
+        """Record a successful call, closing the circuit."""
+        self._failures = 0
+        self._open_until = None
+        self._cooldown = self._cooldown_min
+
+    def failure(self, now: float | None = None) -> bool:
+        """Record a failed call, return whether it opened the circuit."""
+        now = time.monotonic() if now is None else now
+        self._failures += 1
+        if self._open_until is None:
+            if self._failures < self._threshold:
+                return False
+        elif now < self._open_until:
+            # a call made before the circuit opened
+            return False
+        else:
+            # the probe failed
+            self._cooldown = min(self._cooldown * 2, self._cooldown_max)
+        self._open_until = now + self._cooldown
+        return True
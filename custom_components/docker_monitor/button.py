@@ -6,31 +6,32 @@ from homeassistant.const import EntityCategory
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from . import COORDINATOR, DOMAIN as DOCKER_MONITOR, DockerMonitorCoordinator
-from .entities import DockerMonitorEntity
+from . import DOMAIN as DOCKER_MONITOR, HUB, DockerMonitorCoordinator, DockerMonitorHub
+from .const import FAMILY_BUTTONS
+from .entities import DockerMonitorEntity, async_setup_container_entities
 
 
 async def async_setup_entry(
     hass: HomeAssistant, entry: ConfigEntry, async_add_entities: AddEntitiesCallback
 ) -> None:
     """Set up the docker monitor sensor."""
-    sensors: list[DockerMonitorEntity] = []
-
-    coordinator: DockerMonitorCoordinator = hass.data[DOCKER_MONITOR][entry.entry_id][
-        COORDINATOR
+    hub: DockerMonitorHub = hass.data[DOCKER_MONITOR][entry.entry_id][HUB]
+    async_setup_container_entities(
+        hass, entry, hub, async_add_entities, _create_buttons
+    )
+
+
+def _create_buttons(
+    coordinator: DockerMonitorCoordinator, container_name: str
+) -> list[DockerMonitorEntity]:
+    if FAMILY_BUTTONS not in coordinator.families(container_name):
+        return []
+    return [
+        DockerMonitorButton(coordinator, container_name, "start"),
+        DockerMonitorButton(coordinator, container_name, "stop"),
+        DockerMonitorButton(coordinator, container_name, "restart"),
     ]
 
-    for container_name, _data in coordinator.data.items():
-        sensors.extend(
-            (
-                DockerMonitorButton(coordinator, container_name, "start"),
-                DockerMonitorButton(coordinator, container_name, "stop"),
-                DockerMonitorButton(coordinator, container_name, "restart"),
-            )
-        )
-
-    async_add_entities(sensors)
-
 
 class DockerMonitorButton(DockerMonitorEntity, ButtonEntity):
     """Status sensor."""
@@ -44,12 +45,7 @@ class DockerMonitorButton(DockerMonitorEntity, ButtonEntity):
 
     async def async_press(self) -> None:
         """Press the button."""
-        if self._key == "stop":
-            await self.coordinator.stop_container(self._container_name)
-        elif self._key == "start":
-            await self.coordinator.start_container(self._container_name)
-        else:
-            await self.coordinator.restart_container(self._container_name)
+        await self.coordinator.container_action(self._container_name, self._key)
 
     @property
     def device_class(self) -> ButtonDeviceClass | None:
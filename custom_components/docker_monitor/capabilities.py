@@ -0,0 +1,76 @@
+"""Capabilities of a docker engine, probed once and cached with the config entry."""
+from __future__ import annotations
+
+from collections.abc import Mapping
+from dataclasses import asdict, dataclass
+from typing import Any
+from urllib.parse import urlsplit
+
+from .engine import DockerEngineClient
+
+# first API version answering stats with one-shot, without waiting for precpu_stats
+ONE_SHOT_API_VERSION = (1, 41)
+
+
+def _api_version(value: str) -> tuple[int, ...]:
+    try:
+        return tuple(int(part) for part in value.split("."))
+    except ValueError:
+        return ()
+
+
+@dataclass(frozen=True, slots=True)
+class EngineCapabilities:
+    """What an engine supports, to pick the cheapest way of collecting its data.
+
+    cgroup_version is None when the engine doesn't tell it, before API 1.40.
+    """
+
+    api_version: str
+    cgroup_version: int | None
+    one_shot: bool
+    rootless: bool
+    remote: bool
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the capabilities to store in the config entry."""
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> EngineCapabilities:
+        """Rebuild capabilities stored with as_dict."""
+        return cls(
+            api_version=data["api_version"],
+            cgroup_version=data.get("cgroup_version"),
+            one_shot=data["one_shot"],
+            rootless=data["rootless"],
+            remote=data["remote"],
+        )
+
+    @property
+    def container_cgroups(self) -> bool:
+        """Return whether containers have their own cgroup on the engine host.
+
+        Rootless engines only get one with cgroup v2.
+        """
+        return not self.rootless or self.cgroup_version == 2
+
+
+async def async_probe_engine(client: DockerEngineClient) -> EngineCapabilities:
+    """Ping the engine and read its capabilities.
+
+    Unlike the disk usage, `/_ping`, `/version` and `/info` answer right away
+    whatever the number of images and volumes.
+    """
+    await client.ping()
+    version = await client.version()
+    info = await client.info()
+    api_version = version.get("ApiVersion", "")
+    cgroup_version = info.get("CgroupVersion")
+    return EngineCapabilities(
+        api_version=api_version,
+        cgroup_version=int(cgroup_version) if cgroup_version else None,
+        one_shot=_api_version(api_version) >= ONE_SHOT_API_VERSION,
+        rootless="name=rootless" in (info.get("SecurityOptions") or []),
+        remote=urlsplit(client.url).scheme != "unix",
+    )
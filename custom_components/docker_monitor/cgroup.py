@@ -0,0 +1,156 @@
+"""Stats of local containers, read from their cgroup instead of the engine.
+
+Frames have the shape of the engine stats frames, with only the fields the
+snapshots use, so they are computed the same way. Needs the host /proc and
+/sys/fs/cgroup, cgroup v2 and v1 are supported.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+import logging
+import os
+from typing import Any
+
+_LOGGER = logging.getLogger(__name__)
+
+SYS_CGROUP = "/sys/fs/cgroup"
+PROC = "/proc"
+
+# /proc/stat counts in ticks of USER_HZ
+NANOSECONDS_PER_TICK = 1_000_000_000 // os.sysconf("SC_CLK_TCK")
+
+
+def _read(path: str) -> str:
+    with open(path, encoding="ascii") as file:
+        return file.read()
+
+
+def _read_keyed(path: str) -> dict[str, int]:
+    """Read a file of `key value` lines."""
+    values = {}
+    for line in _read(path).splitlines():
+        key, _, value = line.partition(" ")
+        values[key] = int(value)
+    return values
+
+
+class CgroupReader:
+    """Build stats frames of containers from their cgroup and network namespace."""
+
+    def __init__(self, sys_root: str = SYS_CGROUP, proc_root: str = PROC) -> None:
+        """Init."""
+        self._sys_root = sys_root
+        self._proc_root = proc_root
+        self._v2 = os.path.exists(os.path.join(sys_root, "cgroup.controllers"))
+        # (container id, pid) -> (cpu cgroup, memory cgroup)
+        self._paths: dict[tuple[str, int], tuple[str, str]] = {}
+
+    def read_all(
+        self, containers: list[dict[str, Any]]
+    ) -> dict[str, dict[str, Any] | None]:
+        """Return a stats frame per container id, None for the unreadable ones.
+
+        Does blocking I/O, meant to run in the executor, once for all containers.
+        """
+        system, online_cpus = self._read_system()
+        host_memory = self._read_host_memory()
+        read = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f") + "000Z"
+
+        frames: dict[str, dict[str, Any] | None] = {}
+        paths: dict[tuple[str, int], tuple[str, str]] = {}
+        for container in containers:
+            key = (container["Id"], container["State"]["Pid"])
+            try:
+                paths[key] = self._paths.get(key) or self._find_cgroups(key[1])
+                frames[key[0]] = {
+                    "read": read,
+                    "cpu_stats": {
+                        "cpu_usage": {"total_usage": self._read_cpu(paths[key][0])},
+                        "system_cpu_usage": system,
+                        "online_cpus": online_cpus,
+                    },
+                    "memory_stats": self._read_memory(paths[key][1], host_memory),
+                    "networks": self._read_networks(key[1]),
+                }
+            except (OSError, ValueError) as err:
+                _LOGGER.debug("Cannot read cgroup of %s: %s", key[0], err)
+                frames[key[0]] = None
+        # forget containers gone or restarted
+        self._paths = paths
+        return frames
+
+    def _read_system(self) -> tuple[int, int]:
+        """Return the total cpu time of the host in ns, and its number of cpus."""
+        system = 0
+        online_cpus = 0
+        for line in _read(os.path.join(self._proc_root, "stat")).splitlines():
+            if line.startswith("cpu "):
+                # user nice system idle iowait irq softirq steal
+                system = sum(int(v) for v in line.split()[1:9]) * NANOSECONDS_PER_TICK
+            elif line.startswith("cpu"):
+                online_cpus += 1
+        return system, online_cpus
+
+    def _read_host_memory(self) -> int:
+        for line in _read(os.path.join(self._proc_root, "meminfo")).splitlines():
+            if line.startswith("MemTotal:"):
+                return int(line.split()[1]) * 1024
+        return 0
+
+    def _find_cgroups(self, pid: int) -> tuple[str, str]:
+        """Return the cpu and memory cgroup directories of a process."""
+        cpu = memory = None
+        path = os.path.join(self._proc_root, str(pid), "cgroup")
+        for line in _read(path).splitlines():
+            _, controllers, cgroup = line.split(":", 2)
+            cgroup = cgroup.lstrip("/")
+            if self._v2 and controllers == "":
+                cpu = memory = os.path.join(self._sys_root, cgroup)
+            elif "cpuacct" in controllers.split(","):
+                cpu = os.path.join(self._sys_root, "cpuacct", cgroup)
+            elif controllers == "memory":
+                memory = os.path.join(self._sys_root, "memory", cgroup)
+        if cpu is None or memory is None:
+            raise ValueError(f"No cpu or memory cgroup for pid {pid}")
+        return cpu, memory
+
+    def _read_cpu(self, cgroup: str) -> int:
+        """Return the cpu time of a cgroup in ns."""
+        if self._v2:
+            return _read_keyed(os.path.join(cgroup, "cpu.stat"))["usage_usec"] * 1000
+        return int(_read(os.path.join(cgroup, "cpuacct.usage")))
+
+    def _read_memory(self, cgroup: str, host_memory: int) -> dict[str, Any]:
+        if self._v2:
+            usage = int(_read(os.path.join(cgroup, "memory.current")))
+            limit = _read(os.path.join(cgroup, "memory.max")).strip()
+            inactive_file = _read_keyed(os.path.join(cgroup, "memory.stat"))[
+                "inactive_file"
+            ]
+        else:
+            usage = int(_read(os.path.join(cgroup, "memory.usage_in_bytes")))
+            limit = _read(os.path.join(cgroup, "memory.limit_in_bytes")).strip()
+            inactive_file = _read_keyed(os.path.join(cgroup, "memory.stat"))[
+                "total_inactive_file"
+            ]
+        # like the engine, an unlimited container is limited by the host memory
+        max_ = host_memory if limit == "max" else min(int(limit), host_memory)
+        return {
+            "usage": usage,
+            "limit": max_,
+            "stats": {"inactive_file": inactive_file},
+        }
+
+    def _read_networks(self, pid: int) -> dict[str, dict[str, int]]:
+        """Return the traffic of the interfaces of the network namespace of pid."""
+        networks = {}
+        path = os.path.join(self._proc_root, str(pid), "net", "dev")
+        # two header lines, then `name: rx_bytes ... (8 rx fields) tx_bytes ...`
+        for line in _read(path).splitlines()[2:]:
+            name, _, counters = line.partition(":")
+            name = name.strip()
+            if name == "lo":
+                continue
+            fields = counters.split()
+            networks[name] = {"rx_bytes": int(fields[0]), "tx_bytes": int(fields[8])}
+        return networks
@@ -1,8 +1,9 @@
 """Config flow for multimatic integration."""
+import asyncio
 import logging
+import re
+from typing import Any
 
-import docker
-from docker.errors import DockerException
 import voluptuous as vol
 
 from homeassistant import config_entries, core, exceptions
@@ -12,7 +13,53 @@ from homeassistant.core import HomeAssistant, callback
 from homeassistant.data_entry_flow import FlowResult
 import homeassistant.helpers.config_validation as cv
 
-from .const import DEFAULT_SCAN_INTERVAL, DOMAIN
+from .capabilities import async_probe_engine
+from .const import (
+    CONF_CAPABILITIES,
+    CONF_CONTAINER_FAMILIES,
+    CONF_CPU_DEADBAND,
+    CONF_DIAGNOSTIC_SENSORS,
+    CONF_DISK_USAGE_INTERVAL,
+    CONF_EXCLUDE,
+    CONF_INCLUDE,
+    CONF_MAX_CONCURRENCY,
+    CONF_MAX_SAMPLE_INTERVAL,
+    CONF_MAX_STATS_REQUESTS,
+    CONF_MEMORY_DEADBAND,
+    CONF_METRIC_FAMILIES,
+    CONF_METRICS_EXPORT,
+    CONF_MIN_SAMPLE_INTERVAL,
+    CONF_NETWORK_DEADBAND,
+    CONF_STATS_MODE,
+    CONF_URLS,
+    CONF_WINDOWS,
+    DEFAULT_CONTAINER_FAMILIES,
+    DEFAULT_CPU_DEADBAND,
+    DEFAULT_DIAGNOSTIC_SENSORS,
+    DEFAULT_DISK_USAGE_INTERVAL,
+    DEFAULT_EXCLUDE,
+    DEFAULT_INCLUDE,
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_MAX_SAMPLE_INTERVAL,
+    DEFAULT_MAX_STATS_REQUESTS,
+    DEFAULT_MEMORY_DEADBAND,
+    DEFAULT_METRIC_FAMILIES,
+    DEFAULT_METRICS_EXPORT,
+    DEFAULT_MIN_SAMPLE_INTERVAL,
+    DEFAULT_NETWORK_DEADBAND,
+    DEFAULT_SCAN_INTERVAL,
+    DEFAULT_STATS_MODE,
+    DEFAULT_WINDOWS,
+    DOMAIN,
+    METRIC_FAMILIES,
+    STATS_MODE_CGROUP,
+    STATS_MODE_ONE_SHOT,
+    STATS_MODE_STREAM,
+)
+from .engine import DockerEngineError, create_engine_client
+from .families import parse_container_families
+from .filters import parse_rules
+from .windows import parse_windows
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -23,34 +70,70 @@ DATA_SCHEMA = vol.Schema(
 )
 
 
+def split_urls(value: str) -> list[str]:
+    """Split URLs separated by commas, spaces or new lines, without duplicates."""
+    return list(dict.fromkeys(url for url in re.split(r"[\s,]+", value) if url))
+
+
+def windows(value: str) -> str:
+    """Validate window durations in minutes, separated by commas."""
+    try:
+        return ", ".join(str(minutes) for minutes in parse_windows(value))
+    except ValueError as err:
+        raise vol.Invalid(
+            "Window durations must be positive minutes, separated by commas"
+        ) from err
+
+
+def container_families(value: str) -> str:
+    """Validate metric families overrides of containers."""
+    try:
+        parse_container_families(value)
+    except ValueError as err:
+        raise vol.Invalid(str(err)) from err
+    return value.strip()
+
+
+def container_rules(value: str) -> str:
+    """Validate include or exclude rules of containers."""
+    try:
+        return ", ".join(f"{kind}:{pattern}" for kind, pattern in parse_rules(value))
+    except ValueError as err:
+        raise vol.Invalid(str(err)) from err
+
+
 async def validate_input(hass: core.HomeAssistant, data):
     """Validate the user input allows us to connect.
 
     Data has the keys from DATA_SCHEMA with values provided by the user.
     """
+    urls = split_urls(data[CONF_URL])
+    if not urls:
+        raise InvalidURL
+    capabilities = await asyncio.gather(*(validate_url(hass, url) for url in urls))
 
-    await validate_url(hass, data[CONF_URL])
-
-    return {"title": "Docker monitor"}
-
-
-async def validate_url(hass: HomeAssistant, url: str):
-    """Ensure provided credentials are working."""
+    return {
+        "title": "Docker monitor",
+        "data": {CONF_URLS: urls, CONF_CAPABILITIES: dict(zip(urls, capabilities))},
+    }
 
-    def test():
-        docker.DockerClient(base_url=url).df()
 
+async def validate_url(hass: HomeAssistant, url: str) -> dict[str, Any]:
+    """Ensure the engine answers, return its capabilities."""
+    client = create_engine_client(hass, url)
     try:
-        await hass.async_add_executor_job(test)
-    except DockerException as err:
+        return (await async_probe_engine(client)).as_dict()
+    except DockerEngineError as err:
         _LOGGER.exception("URL %s is invalid", url, exc_info=True)
         raise InvalidURL from err
+    finally:
+        await client.close()
 
 
 class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a config flow for multimatic."""
 
-    VERSION = 1
+    VERSION = 2
     CONNECTION_CLASS = config_entries.CONN_CLASS_LOCAL_POLL
 
     @staticmethod
@@ -65,7 +148,7 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         if user_input is not None:
             try:
                 info = await validate_input(self.hass, user_input)
-                return self.async_create_entry(title=info["title"], data=user_input)
+                return self.async_create_entry(title=info["title"], data=info["data"])
             except InvalidURL:
                 errors["base"] = "invalid_url"
             except Exception:  # pylint: disable=broad-except
@@ -97,7 +180,103 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                     default=self.config_entry.options.get(
                         CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL
                     ),
-                ): cv.positive_int
+                ): cv.positive_int,
+                vol.Optional(
+                    CONF_STATS_MODE,
+                    default=self.config_entry.options.get(
+                        CONF_STATS_MODE, DEFAULT_STATS_MODE
+                    ),
+                ): vol.In([STATS_MODE_STREAM, STATS_MODE_ONE_SHOT, STATS_MODE_CGROUP]),
+                vol.Optional(
+                    CONF_MAX_CONCURRENCY,
+                    default=self.config_entry.options.get(
+                        CONF_MAX_CONCURRENCY, DEFAULT_MAX_CONCURRENCY
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1)),
+                vol.Optional(
+                    CONF_MIN_SAMPLE_INTERVAL,
+                    default=self.config_entry.options.get(
+                        CONF_MIN_SAMPLE_INTERVAL, DEFAULT_MIN_SAMPLE_INTERVAL
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1)),
+                vol.Optional(
+                    CONF_MAX_SAMPLE_INTERVAL,
+                    default=self.config_entry.options.get(
+                        CONF_MAX_SAMPLE_INTERVAL, DEFAULT_MAX_SAMPLE_INTERVAL
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Range(min=1)),
+                vol.Optional(
+                    CONF_MAX_STATS_REQUESTS,
+                    default=self.config_entry.options.get(
+                        CONF_MAX_STATS_REQUESTS, DEFAULT_MAX_STATS_REQUESTS
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+                vol.Optional(
+                    CONF_WINDOWS,
+                    default=self.config_entry.options.get(
+                        CONF_WINDOWS, DEFAULT_WINDOWS
+                    ),
+                ): vol.All(str, windows),
+                vol.Optional(
+                    CONF_INCLUDE,
+                    default=self.config_entry.options.get(
+                        CONF_INCLUDE, DEFAULT_INCLUDE
+                    ),
+                ): vol.All(str, container_rules),
+                vol.Optional(
+                    CONF_EXCLUDE,
+                    default=self.config_entry.options.get(
+                        CONF_EXCLUDE, DEFAULT_EXCLUDE
+                    ),
+                ): vol.All(str, container_rules),
+                vol.Optional(
+                    CONF_METRIC_FAMILIES,
+                    default=self.config_entry.options.get(
+                        CONF_METRIC_FAMILIES, DEFAULT_METRIC_FAMILIES
+                    ),
+                ): cv.multi_select({family: family for family in METRIC_FAMILIES}),
+                vol.Optional(
+                    CONF_CONTAINER_FAMILIES,
+                    default=self.config_entry.options.get(
+                        CONF_CONTAINER_FAMILIES, DEFAULT_CONTAINER_FAMILIES
+                    ),
+                ): vol.All(str, container_families),
+                vol.Optional(
+                    CONF_CPU_DEADBAND,
+                    default=self.config_entry.options.get(
+                        CONF_CPU_DEADBAND, DEFAULT_CPU_DEADBAND
+                    ),
+                ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                vol.Optional(
+                    CONF_MEMORY_DEADBAND,
+                    default=self.config_entry.options.get(
+                        CONF_MEMORY_DEADBAND, DEFAULT_MEMORY_DEADBAND
+                    ),
+                ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                vol.Optional(
+                    CONF_NETWORK_DEADBAND,
+                    default=self.config_entry.options.get(
+                        CONF_NETWORK_DEADBAND, DEFAULT_NETWORK_DEADBAND
+                    ),
+                ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                vol.Optional(
+                    CONF_DISK_USAGE_INTERVAL,
+                    default=self.config_entry.options.get(
+                        CONF_DISK_USAGE_INTERVAL, DEFAULT_DISK_USAGE_INTERVAL
+                    ),
+                ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+                vol.Optional(
+                    CONF_METRICS_EXPORT,
+                    default=self.config_entry.options.get(
+                        CONF_METRICS_EXPORT, DEFAULT_METRICS_EXPORT
+                    ),
+                ): bool,
+                vol.Optional(
+                    CONF_DIAGNOSTIC_SENSORS,
+                    default=self.config_entry.options.get(
+                        CONF_DIAGNOSTIC_SENSORS, DEFAULT_DIAGNOSTIC_SENSORS
+                    ),
+                ): bool,
             }
         )
         return self.async_show_form(step_id="init", data_schema=data_schema)
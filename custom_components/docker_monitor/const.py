@@ -5,9 +5,91 @@ DOMAIN = "docker_monitor"
 # list of platforms into entity are created
 PLATFORMS = ["sensor", "binary_sensor", "button"]
 
+# configuration
+CONF_URLS = "urls"
+# engine capabilities probed by the config flow, per url
+CONF_CAPABILITIES = "capabilities"
+CONF_STATS_MODE = "stats_mode"
+CONF_MAX_CONCURRENCY = "max_concurrency"
+CONF_CPU_DEADBAND = "cpu_deadband"
+CONF_MEMORY_DEADBAND = "memory_deadband"
+CONF_NETWORK_DEADBAND = "network_deadband"
+CONF_DIAGNOSTIC_SENSORS = "diagnostic_sensors"
+CONF_MIN_SAMPLE_INTERVAL = "min_sample_interval"
+CONF_MAX_SAMPLE_INTERVAL = "max_sample_interval"
+CONF_MAX_STATS_REQUESTS = "max_stats_requests"
+CONF_WINDOWS = "windows"
+CONF_METRIC_FAMILIES = "metric_families"
+CONF_CONTAINER_FAMILIES = "container_families"
+CONF_INCLUDE = "include"
+CONF_EXCLUDE = "exclude"
+CONF_DISK_USAGE_INTERVAL = "disk_usage_interval"
+CONF_METRICS_EXPORT = "metrics_export"
+
+# stats collection modes
+STATS_MODE_STREAM = "stream"
+STATS_MODE_ONE_SHOT = "one_shot"
+STATS_MODE_CGROUP = "cgroup"
+
+# metric families, each one has its entities and is collected only if enabled
+FAMILY_CPU = "cpu"
+FAMILY_MEMORY = "memory"
+FAMILY_NETWORK = "network"
+FAMILY_UPTIME = "uptime"
+FAMILY_BUTTONS = "buttons"
+FAMILY_HEALTH = "health"
+METRIC_FAMILIES = [
+    FAMILY_CPU,
+    FAMILY_MEMORY,
+    FAMILY_NETWORK,
+    FAMILY_UPTIME,
+    FAMILY_BUTTONS,
+    FAMILY_HEALTH,
+]
+
 # default values for configuration
 DEFAULT_SCAN_INTERVAL = 30
+DEFAULT_STATS_MODE = STATS_MODE_STREAM
+DEFAULT_MAX_CONCURRENCY = 10
+# changes smaller than these are not written to the entity states
+DEFAULT_CPU_DEADBAND = 0.0  # percentage points
+DEFAULT_MEMORY_DEADBAND = 0.0  # MiB
+DEFAULT_NETWORK_DEADBAND = 0.0  # KiB/s
+DEFAULT_DIAGNOSTIC_SENSORS = False
+# one_shot mode adapts the sampling interval of each container between these
+DEFAULT_MIN_SAMPLE_INTERVAL = 10
+DEFAULT_MAX_SAMPLE_INTERVAL = 300
+DEFAULT_MAX_STATS_REQUESTS = 100  # per refresh, 0 for no limit
+DEFAULT_WINDOWS = "15"  # minutes, separated by commas
+# state attribute of the rolling-window aggregates
+ATTR_WINDOWS = "windows"
+DEFAULT_METRIC_FAMILIES = METRIC_FAMILIES
+DEFAULT_INCLUDE = ""  # `kind:pattern` rules separated by commas
+DEFAULT_EXCLUDE = ""
+DEFAULT_CONTAINER_FAMILIES = ""  # `name: family, ...` separated by semicolons
+# the disk usage is expensive for the engine, it is collected apart and rarely
+DEFAULT_DISK_USAGE_INTERVAL = 3600  # seconds, 0 to disable
+DEFAULT_METRICS_EXPORT = False
+
+# bulk_action service
+SERVICE_BULK_ACTION = "bulk_action"
+ATTR_ACTION = "action"
+ATTR_NAMES = "names"
+ATTR_LABELS = "labels"
+ATTR_COMPOSE_PROJECTS = "compose_projects"
+ATTR_PARALLELISM = "parallelism"
+ATTR_TIMEOUT = "timeout"
+ATTR_SIGNAL = "signal"
+CONTAINER_ACTIONS = ["start", "stop", "restart", "kill"]
+DEFAULT_PARALLELISM = 5
+MAX_PARALLELISM = 20
+# fired with the result of each container once a bulk action is done
+EVENT_BULK_ACTION = "docker_monitor_bulk_action"
 
 # keys
-COORDINATOR = "coordinator"
+HUB = "hub"
 EVENTS_LISTENER = "events_listener"
+
+# dispatcher signals, formatted with the id of the host device
+SIGNAL_CONTAINER_ADDED = "docker_monitor_container_added_{}"
+SIGNAL_DISK_USAGE_UPDATED = "docker_monitor_disk_usage_updated_{}"
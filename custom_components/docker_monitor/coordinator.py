@@ -1,229 +1,977 @@
 """Docker monitor coordinator."""
-from datetime import datetime, timedelta, timezone
+import asyncio
+from collections.abc import Collection, Mapping
+from contextlib import suppress
+from datetime import timedelta
 from functools import partial
 import logging
-import threading
+import math
+import time
 from typing import Any
+from urllib.parse import urlsplit
 
-from docker import DockerClient
-from docker.models.containers import Container
+import aiohttp
+import async_timeout
 
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import device_registry as dr, entity_registry as er
 from homeassistant.helpers.debounce import Debouncer
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    CONF_CONTAINER_FAMILIES,
+    CONF_CPU_DEADBAND,
+    CONF_EXCLUDE,
+    CONF_INCLUDE,
+    CONF_MAX_CONCURRENCY,
+    CONF_MAX_SAMPLE_INTERVAL,
+    CONF_MAX_STATS_REQUESTS,
+    CONF_METRICS_EXPORT,
+    CONF_MEMORY_DEADBAND,
+    CONF_METRIC_FAMILIES,
+    CONF_MIN_SAMPLE_INTERVAL,
+    CONF_NETWORK_DEADBAND,
+    CONF_STATS_MODE,
+    CONF_WINDOWS,
+    DEFAULT_CONTAINER_FAMILIES,
+    DEFAULT_CPU_DEADBAND,
+    DEFAULT_EXCLUDE,
+    DEFAULT_INCLUDE,
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_MAX_SAMPLE_INTERVAL,
+    DEFAULT_MAX_STATS_REQUESTS,
+    DEFAULT_METRICS_EXPORT,
+    DEFAULT_MEMORY_DEADBAND,
+    DEFAULT_METRIC_FAMILIES,
+    DEFAULT_MIN_SAMPLE_INTERVAL,
+    DEFAULT_NETWORK_DEADBAND,
+    DEFAULT_STATS_MODE,
+    DEFAULT_WINDOWS,
+    DOMAIN,
+    SIGNAL_CONTAINER_ADDED,
+    SIGNAL_DISK_USAGE_UPDATED,
+    STATS_MODE_CGROUP,
+    STATS_MODE_ONE_SHOT,
+    STATS_MODE_STREAM,
+)
+from .breaker import CircuitBreaker
+from .capabilities import EngineCapabilities, async_probe_engine
+from .cgroup import CgroupReader
+from .engine import DockerEngineClient, DockerEngineError, create_engine_client
+from .export import SampleExporter
+from .families import MetricFamilies, parse_container_families
+from .filters import ContainerFilter, parse_rules
+from .instrumentation import Instrumentation
+from .model import ContainerSnapshot, DiskUsage, HostTotals
+from .registry import ContainerRegistry, container_matches, container_name, persisted
+from .sampler import StatsSampler
+from .sampling import SamplingScheduler, is_volatile
+from .windows import parse_windows
 
 _LOGGER = logging.getLogger(__name__)
 
+# seconds between reconnections of the events stream, doubling up to the max
+EVENTS_RETRY_MIN = 1
+EVENTS_RETRY_MAX = 60
+# seconds of events replayed when reconnecting before any event was received
+EVENTS_REPLAY_MARGIN = 5
+# seconds between the openings of the stats streams after listing the engine
+STREAM_START_SPREAD = 0.02
+EVENTS_FILTERS = {
+    "type": ["container"],
+    "event": [
+        "start",
+        "stop",
+        "create",
+        "destroy",
+        "rename",
+        "die",
+        "oom",
+        "restart",
+        # the engine matches `health_status: <status>` actions
+        "health_status",
+    ],
+}
+# events updating the known state of a container, without inspecting it
+STATE_EVENTS = ("oom", "restart", "health_status")
+
+
+def host_name(url: str) -> str:
+    """Return a readable name of the docker host behind url."""
+    parts = urlsplit(url)
+    return parts.netloc or parts.path or url
+
+
+def _within(old: Any, value: Any, deadband: float) -> bool:
+    """Return whether value didn't move from old by more than the dead-band."""
+    return old == value or bool(
+        deadband
+        and old is not None
+        and value is not None
+        and abs(value - old) < deadband
+    )
+
+
+@callback
+def async_remove_device(hass: HomeAssistant, identifier: str) -> None:
+    """Remove a device of the integration and its entities."""
+    dev_reg = dr.async_get(hass)
+    if device := dev_reg.async_get_device({(DOMAIN, identifier)}):
+        _LOGGER.debug("Removing device %s", identifier)
+        ent_reg = er.async_get(hass)
+        for entity in er.async_entries_for_device(
+            ent_reg, device.id, include_disabled_entities=True
+        ):
+            ent_reg.async_remove(entity.entity_id)
+        dev_reg.async_remove_device(device.id)
+
 
 class DockerMonitorCoordinator(DataUpdateCoordinator):
-    """Docker monitor coordinator."""
+    """Docker monitor coordinator, for one docker host."""
 
     def __init__(
-        self, hass: HomeAssistant, url: str, update_interval: timedelta
+        self,
+        hass: HomeAssistant,
+        entry_id: str,
+        url: str,
+        update_interval: timedelta | None,
+        options: Mapping[str, Any],
+        *,
+        timeout: float | None = None,
+        session: aiohttp.ClientSession | None = None,
+        prefix: str = "",
+        capabilities: EngineCapabilities | None = None,
     ) -> None:
-        """Init."""
+        """Init.
+
+        Without update_interval, refreshes are scheduled by the caller. A refresh
+        taking more than timeout seconds fails, prefix is prepended to entity ids.
+        Without capabilities, the engine is probed once it answers.
+        """
 
         debouncer = Debouncer(
             hass,
             _LOGGER,
             cooldown=5.0,
             immediate=True,
-            function=self.async_refresh,
+            function=self.async_refresh_if_idle,
         )
 
         super().__init__(
             hass,
             _LOGGER,
-            name="DockerMonitorCoordinator",
+            name=f"docker {url}",
             update_interval=update_interval,
             update_method=self._refresh,
             request_refresh_debouncer=debouncer,
         )
 
+        self._entry_id = entry_id
         self._url: str = url
-        self._docker: DockerClient
-        self._containers: list[Container] = []
-        self._monitors: dict[Container, Any] = {}
-        self._old_data: dict[str, Any] = {}
+        self._session = session
+        self._timeout = timeout
+        self._prefix = prefix
+        self._docker: DockerEngineClient = create_engine_client(hass, url, session)
+        self._containers = ContainerRegistry()
+        self._monitors: dict[str, StatsSampler] = {}
+        self._snapshots: dict[str, ContainerSnapshot] = {}
+        self._events_task: asyncio.Task | None = None
+        # engine timestamp of the last event applied, to resume the events stream
+        self._events_since: str | None = None
+        # nanoseconds of the last event applied, and the events applied at that
+        # time, which the engine replays when resuming
+        self._events_nanos = 0
+        self._events_applied: set[tuple[str, str]] = set()
+        self._stats_mode = options.get(CONF_STATS_MODE, DEFAULT_STATS_MODE)
+        self._cgroup: CgroupReader | None = None
+        if self._stats_mode == STATS_MODE_CGROUP:
+            if urlsplit(url).scheme == "unix":
+                self._cgroup = CgroupReader()
+            else:
+                _LOGGER.warning("%s is not a local engine, using one_shot stats", url)
+                self._stats_mode = STATS_MODE_ONE_SHOT
+        self._capabilities: EngineCapabilities | None = None
+        if capabilities:
+            self._set_capabilities(capabilities)
+        self._max_concurrency = options.get(
+            CONF_MAX_CONCURRENCY, DEFAULT_MAX_CONCURRENCY
+        )
+        self._cpu_deadband: float = options.get(CONF_CPU_DEADBAND, DEFAULT_CPU_DEADBAND)
+        self._memory_deadband: float = (
+            options.get(CONF_MEMORY_DEADBAND, DEFAULT_MEMORY_DEADBAND) * 1024 * 1024
+        )
+        self._network_deadband: float = (
+            options.get(CONF_NETWORK_DEADBAND, DEFAULT_NETWORK_DEADBAND) * 1024
+        )
+        # one_shot mode samples each container at its own pace
+        self._scheduler = SamplingScheduler(
+            options.get(CONF_MIN_SAMPLE_INTERVAL, DEFAULT_MIN_SAMPLE_INTERVAL),
+            options.get(CONF_MAX_SAMPLE_INTERVAL, DEFAULT_MAX_SAMPLE_INTERVAL),
+            options.get(CONF_MAX_STATS_REQUESTS, DEFAULT_MAX_STATS_REQUESTS),
+        )
+        # minutes of the rolling windows of the metrics
+        self._windows = parse_windows(options.get(CONF_WINDOWS, DEFAULT_WINDOWS))
+        # containers monitored, the other ones are ignored
+        self._filter = ContainerFilter(
+            parse_rules(options.get(CONF_INCLUDE, DEFAULT_INCLUDE)),
+            parse_rules(options.get(CONF_EXCLUDE, DEFAULT_EXCLUDE)),
+        )
+        # metric families collected and exposed, per container
+        self._families = MetricFamilies(
+            options.get(CONF_METRIC_FAMILIES, DEFAULT_METRIC_FAMILIES),
+            parse_container_families(
+                options.get(CONF_CONTAINER_FAMILIES, DEFAULT_CONTAINER_FAMILIES)
+            ),
+        )
+        # (container name, metric) -> value entities last wrote
+        self._published: dict[tuple[str, str], Any] = {}
+        # metrics changed by the last refresh, None when all entities must update
+        self._changed: set[tuple[str, str]] | None = None
+        self._last_update_success = True
+        self._stopped = False
+        # a refresh is running, the ones asked meanwhile are skipped
+        self._refreshing = False
+        # the engine must be listed again before the next refresh
+        self._needs_resync = False
+        # stops calling an engine which doesn't answer anymore
+        self._breaker = CircuitBreaker()
+        self.instrumentation = Instrumentation()
+        # container name -> id of the containers having entities
+        self._announced: dict[str, str] = {}
+        # totals of all containers, computed by the last refresh
+        self.totals = HostTotals()
+        # disk usage, collected apart from the refreshes as it is slow
+        self.disk_usage: DiskUsage | None = None
+        self._disk_usage_task: asyncio.Task | None = None
+        # latest samples served apart from the entities, with the stream frames
+        self.exporter: SampleExporter | None = None
+        if options.get(CONF_METRICS_EXPORT, DEFAULT_METRICS_EXPORT):
+            self.exporter = SampleExporter(hass, host_name(url))
+
+    async def async_refresh_if_idle(self) -> bool:
+        """Refresh, unless a refresh is still running, return whether it ran."""
+        if self._refreshing:
+            return False
+        self._refreshing = True
+        try:
+            await self.async_refresh()
+        finally:
+            self._refreshing = False
+        return True
 
     async def init(self) -> None:
-        """Init the coordinator."""
-        await self._refresh_docker_client()
-        await self._init()
-        await self._start_listening_events()
+        """Init the coordinator.
 
-    async def restart_container(self, name: str) -> None:
-        """Restart container if found."""
-        container: Container = await self._get_container(name)
-        if container:
-            await self.hass.async_add_executor_job(container.restart)
-
-    async def start_container(self, name: str) -> None:
-        """Start container if found."""
-        container: Container = await self._get_container(name)
-        if container:
-            await self.hass.async_add_executor_job(container.start)
+        An unreachable engine doesn't fail, it is listed again on the next refresh.
+        """
+        try:
+            async with async_timeout.timeout(self._timeout):
+                await self._init()
+        except (DockerEngineError, asyncio.TimeoutError) as err:
+            self.logger.warning(
+                "Cannot list containers of %s: %s", self._url, err or "timeout"
+            )
+            self._needs_resync = True
+        except Exception:  # pylint: disable=broad-except
+            self.logger.exception("Unexpected error listing %s", self._url)
+            self._needs_resync = True
+        await self._start_listening_events()
 
-    async def stop_container(self, name: str) -> None:
-        """Stop container if found."""
-        container: Container = await self._get_container(name)
-        if container:
-            await self.hass.async_add_executor_job(container.stop)
+    async def async_stop(self) -> None:
+        """Stop listening to the engine and release connections."""
+        self._stopped = True
+        self._debounced_refresh.async_cancel()
+        if self.exporter:
+            self.exporter.async_stop()
+        if self._disk_usage_task:
+            self._disk_usage_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._disk_usage_task
+            self._disk_usage_task = None
+        if self._events_task:
+            self._events_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._events_task
+            self._events_task = None
+        await self._close_monitors()
+        await self._docker.close()
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Announce added and removed containers, then update all listeners."""
+        if self.last_update_success != self._last_update_success:
+            # availability changed, every entity must write its state
+            self._last_update_success = self.last_update_success
+            self._changed = None
+        self._announce_containers()
+        with self.instrumentation.timer("fan_out"):
+            super().async_update_listeners()
+
+    @property
+    def host_id(self) -> str:
+        """Return the identifier of the docker host device."""
+        if self._prefix:
+            return f"host_{self._entry_id}_{self._prefix}"
+        return f"host_{self._entry_id}"
+
+    @property
+    def host_name(self) -> str:
+        """Return a readable name of the docker host."""
+        return host_name(self._url)
+
+    @property
+    def prefix(self) -> str:
+        """Return the prefix of the entity ids of this host."""
+        return self._prefix
+
+    @property
+    def container_ids(self) -> set[str]:
+        """Return the ids of the containers having entities."""
+        return set(self._announced.values())
+
+    @property
+    def url(self) -> str:
+        """Return the url of the docker host."""
+        return self._url
+
+    def _set_capabilities(self, capabilities: EngineCapabilities) -> None:
+        """Pick the cheapest stats collection the engine supports."""
+        self._capabilities = capabilities
+        if self._cgroup and not capabilities.container_cgroups:
+            _LOGGER.warning(
+                "Containers of the rootless engine %s have no cgroup, using one_shot"
+                " stats",
+                self._url,
+            )
+            self._cgroup = None
+            self._stats_mode = STATS_MODE_ONE_SHOT
+        if self._stats_mode == STATS_MODE_ONE_SHOT and not capabilities.one_shot:
+            _LOGGER.info(
+                "API %s of %s has no one-shot stats, each sample waits for a second"
+                " frame",
+                capabilities.api_version,
+                self._url,
+            )
 
-    async def _refresh_docker_client(self) -> None:
-        def get_client():
-            return DockerClient(base_url=self._url)
+    def as_storage(self) -> dict[str, Any]:
+        """Return the containers and counters to persist across restarts."""
+        return {
+            "capabilities": self._capabilities and self._capabilities.as_dict(),
+            "disk_usage": self.disk_usage and self.disk_usage.as_storage(),
+            "containers": [persisted(attrs) for _, attrs in self._containers.items()],
+            "snapshots": {
+                name: snapshot.as_storage()
+                for name, snapshot in self._snapshots.items()
+            },
+        }
 
-        self._docker = await self.hass.async_add_executor_job(get_client)
+    def restore(self, data: Mapping[str, Any]) -> None:
+        """Restore the containers and counters persisted before a restart.
+
+        Entities can be created from the restored data before the engine answers,
+        and the first rates are computed from the restored counters.
+        """
+        if self._capabilities is None and data.get("capabilities"):
+            self._set_capabilities(EngineCapabilities.from_dict(data["capabilities"]))
+        if data.get("disk_usage"):
+            self.disk_usage = DiskUsage.from_storage(data["disk_usage"])
+        self._containers.replace(data["containers"])
+        snapshots: dict[str, ContainerSnapshot] = {}
+        for name, container in self._containers.items():
+            try:
+                snapshot = ContainerSnapshot.from_storage(data["snapshots"][name])
+            except (KeyError, TypeError, ValueError):
+                snapshot = ContainerSnapshot(container["Id"])
+            if snapshot.id != container["Id"]:
+                snapshot = ContainerSnapshot(container["Id"])
+            # counters of a container restarted meanwhile are dropped on the
+            # first refresh, from its new StartedAt
+            snapshot.update_state(container)
+            snapshots[name] = snapshot
+        self._snapshots = snapshots
+        self.data = snapshots
+        # the platforms create the entities of the restored containers
+        self._announced = {name: s.id for name, s in snapshots.items()}
+
+    def diagnostics(self) -> dict[str, Any]:
+        """Return the state and measures of the coordinator."""
+        return {
+            "url": self._url,
+            "stats_mode": self._stats_mode,
+            "capabilities": self._capabilities and self._capabilities.as_dict(),
+            "containers": len(self._containers),
+            "stats_streams": len(self._monitors),
+            "last_update_success": self.last_update_success,
+            "breaker_open": self._breaker.is_open,
+            "unavailable_containers": sorted(
+                name for name, s in self._snapshots.items() if not s.available
+            ),
+            "instrumentation": self.instrumentation.as_dict(),
+        }
 
-    async def _get_container_list(self) -> list[Container]:
-        return await self.hass.async_add_executor_job(
-            self._docker.containers.list, *{"all": True}
+    def has_changed(self, container_name: str, metric: str | None) -> bool:
+        """Return whether an entity must write its state after the last refresh."""
+        return self._changed is None or (container_name, metric) in self._changed
+
+    def _detect_changes(
+        self, data: dict[str, ContainerSnapshot]
+    ) -> set[tuple[str, str]]:
+        """Return the metrics which changed more than their dead-band."""
+        changed: set[tuple[str, str]] = set()
+        published: dict[tuple[str, str], Any] = {}
+        for name, snapshot in data.items():
+            cpu, mem, net = snapshot.cpu, snapshot.mem, snapshot.net
+            if not snapshot.available:
+                # the stats entities become unavailable
+                cpu = mem = net = None
+            mem_pct_deadband = (
+                self._memory_deadband / mem.max * 100 if mem and mem.max else 0
+            )
+            for metric, value, deadband in (
+                ("status", snapshot.status, 0),
+                ("started_at", snapshot.started_at, 0),
+                ("health", snapshot.health, 0),
+                ("exit_code", snapshot.exit_code, 0),
+                ("oom_kills", snapshot.oom_kills, 0),
+                ("restarts", snapshot.restarts, 0),
+                ("cpu.percentage", cpu and cpu.percentage, self._cpu_deadband),
+                ("mem.usage", mem and mem.usage, self._memory_deadband),
+                ("mem.max", mem and mem.max, self._memory_deadband),
+                ("mem.percentage", mem and mem.percentage, mem_pct_deadband),
+                ("net.speed_tx", net and net.total.speed_tx, self._network_deadband),
+                ("net.speed_rx", net and net.total.speed_rx, self._network_deadband),
+            ):
+                key = (name, metric)
+                old = self._published.get(key)
+                if key in self._published and _within(old, value, deadband):
+                    published[key] = old
+                else:
+                    published[key] = value
+                    changed.add(key)
+                if windows := snapshot.windows.get(metric):
+                    # the aggregates move as samples leave the windows, even when
+                    # the value itself doesn't
+                    windows_key = (name, f"{metric}.windows")
+                    aggregates = windows.as_dict()
+                    old = self._published.get(windows_key)
+                    if (
+                        key not in changed
+                        and old is not None
+                        and all(
+                            _within(
+                                old.get(window, {}).get(aggregate), current, deadband
+                            )
+                            for window, values in aggregates.items()
+                            for aggregate, current in values.items()
+                        )
+                    ):
+                        published[windows_key] = old
+                    else:
+                        published[windows_key] = aggregates
+                        changed.add(key)
+        self._published = published
+        return changed
+
+    @callback
+    def _announce_containers(self) -> None:
+        """Remove devices of gone containers and signal the new ones.
+
+        Signals sent before the platforms are set up are lost, the platforms then
+        create the entities of the containers already known.
+        """
+        if not self.last_update_success or self.data is None:
+            return
+
+        current = {name: snapshot.id for name, snapshot in self.data.items()}
+        for name, container_id in self._announced.items():
+            if current.get(name) != container_id:
+                async_remove_device(self.hass, container_id)
+        for name, container_id in current.items():
+            if self._announced.get(name) != container_id:
+                self.logger.debug("Container %s appeared", name)
+                async_dispatcher_send(
+                    self.hass, SIGNAL_CONTAINER_ADDED.format(self.host_id), name
+                )
+        self._announced = current
+
+    def families(self, name: str) -> frozenset[str]:
+        """Return the metric families enabled for a container."""
+        return self._families.of(name)
+
+    def find_containers(
+        self,
+        names: Collection[str] = (),
+        labels: Collection[str] = (),
+        projects: Collection[str] = (),
+    ) -> list[str]:
+        """Return the names of the containers matching the filters."""
+        return [
+            name
+            for name, attrs in self._containers.items()
+            if container_matches(attrs, names, labels, projects)
+        ]
+
+    async def container_action(self, name: str, action: str, **kwargs: Any) -> None:
+        """Start, stop, restart or kill a container.
+
+        kwargs are passed to the engine client, like the stop timeout.
+        """
+        if (container := await self._get_container(name)) is None:
+            raise DockerEngineError(f"No container {name} on {self._url}", 404)
+        if not self._breaker.allow():
+            raise DockerEngineError(f"{self._url} doesn't answer")
+        try:
+            await getattr(self._docker, action)(container["Id"], **kwargs)
+        except DockerEngineError as err:
+            self._record_call(err)
+            raise
+        self._record_call(None)
+
+    @callback
+    def async_request_disk_usage(self, max_age: timedelta) -> None:
+        """Collect the disk usage in the background, unless newer than max_age.
+
+        A single collection runs at a time, requests made meanwhile are dropped.
+        Refreshes never wait for it.
+        """
+        if self._disk_usage_task and not self._disk_usage_task.done():
+            return
+        if self.disk_usage and dt_util.utcnow() - self.disk_usage.updated < max_age:
+            return
+        self._disk_usage_task = self.hass.async_create_background_task(
+            self._collect_disk_usage(), name=f"docker_monitor disk usage {self._url}"
         )
 
-    async def _get_container(self, name: str) -> Container | None:
-        return next(
-            container for container in self._containers if container.name == name
-        )
+    async def _collect_disk_usage(self) -> None:
+        if not self._breaker.allow():
+            return
+        try:
+            with self.instrumentation.timer("disk_usage"):
+                data = await self._docker.disk_usage()
+        except DockerEngineError as err:
+            self.instrumentation.counters["failed_disk_usage"] += 1
+            self.logger.warning("Cannot get disk usage of %s: %s", self._url, err)
+            return
+        self.disk_usage = DiskUsage.from_df(data, dt_util.utcnow())
+        async_dispatcher_send(self.hass, SIGNAL_DISK_USAGE_UPDATED.format(self.host_id))
 
-    async def _init(self):
-        self._containers = await self._get_container_list()
-        self._monitors = {
-            container: await self.hass.async_add_executor_job(
-                partial(container.stats, **{"decode": True, "stream": True})
+    async def _refresh_docker_client(self) -> None:
+        self.instrumentation.counters["client_rebuilds"] += 1
+        await self._docker.close()
+        self._docker = create_engine_client(self.hass, self._url, self._session)
+
+    async def _resync(self) -> None:
+        """Reconnect to the engine and list the containers again."""
+        # stop the streams first, they would count the closed client as a failure
+        await self._close_monitors()
+        await self._refresh_docker_client()
+        await self._init()
+        self._needs_resync = False
+        self._record_call(None)
+
+    def _record_call(self, err: Exception | None) -> None:
+        """Feed the circuit breaker with the outcome of a call to the engine.
+
+        Errors of an engine which answered, like a container not found, don't
+        count as failures.
+        """
+        if err is None or (isinstance(err, DockerEngineError) and not err.unreachable):
+            self._breaker.success()
+        elif self._breaker.failure():
+            self.instrumentation.counters["breaker_opened"] += 1
+            self.logger.warning(
+                "%s doesn't answer, pausing calls for %.0f seconds",
+                self._url,
+                self._breaker.retry_in(),
+            )
+
+    async def _get_container_list(self) -> list[dict[str, Any]]:
+        """Inspect the monitored containers, filtered by the engine when possible."""
+        containers = [
+            container
+            for container in await self._docker.containers(
+                all_=True, filters=self._filter.list_filters() or None
+            )
+            if self._filter.matches(
+                container["Names"][0].lstrip("/"),
+                container["Image"],
+                container.get("Labels") or {},
             )
-            for container in self._containers
+        ]
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+
+        async def inspect(container_id: str) -> dict[str, Any] | None:
+            async with semaphore:
+                try:
+                    return await self._docker.inspect(container_id)
+                except DockerEngineError as err:
+                    if err.unreachable:
+                        raise
+                    # removed since it was listed
+                    self.logger.debug("Cannot inspect %s: %s", container_id, err)
+                    return None
+
+        inspected = await asyncio.gather(
+            *(inspect(container["Id"]) for container in containers)
+        )
+        return [container for container in inspected if container is not None]
+
+    async def _get_container(self, name: str) -> dict[str, Any] | None:
+        return self._containers.get_by_name(name)
+
+    async def _close_monitors(self) -> None:
+        monitors, self._monitors = self._monitors, {}
+        await asyncio.gather(*(sampler.stop() for sampler in monitors.values()))
+
+    @property
+    def _one_shot(self) -> bool:
+        """Return whether stats can be asked without waiting for a second frame."""
+        return self._capabilities is None or self._capabilities.one_shot
+
+    def _needs_stats(self, container: dict[str, Any]) -> bool:
+        """Return whether the stats of a container must be collected."""
+        running = container["State"]["Status"] == "running"
+        return running and self._families.needs_stats(container_name(container))
+
+    def _sampled_containers(self) -> dict[str, str]:
+        """Return the names of the containers whose stats are collected, by id."""
+        return {
+            container["Id"]: name
+            for name, container in self._containers.items()
+            if self._needs_stats(container)
         }
 
-    async def _start_listening_events(self):
-        def events():
-            self.logger.debug("Starting listening to events")
-            filters = {"event": ["start", "stop", "create", "destroy"]}
-            for evt in self._docker.events(decode=True, filters=filters):
-                self.logger.debug("Received event %s", evt)
-                self.hass.add_job(self._init)
+    def _start_monitor(self, container: dict[str, Any], delay: float = 0) -> None:
+        if (
+            self._stats_mode == STATS_MODE_STREAM
+            and self._needs_stats(container)
+            and container["Id"] not in self._monitors
+        ):
+            sampler = StatsSampler(
+                self.hass,
+                self._docker,
+                container["Id"],
+                self.instrumentation,
+                self._breaker,
+                partial(self._export_frame, container["Id"]) if self.exporter else None,
+            )
+            self._monitors[container["Id"]] = sampler
+            sampler.start(delay)
+
+    @callback
+    def _export_frame(self, container_id: str, frame: dict[str, Any]) -> None:
+        """Export a stats frame as soon as it is received."""
+        assert self.exporter is not None
+        if attrs := self._containers.get(container_id):
+            name = container_name(attrs)
+            self.exporter.update_frame(
+                name, container_id, frame, self._families.of(name)
+            )
 
-            self.logger.debug("Event listening stopped")
+    async def _stop_monitor(self, container_id: str) -> None:
+        if sampler := self._monitors.pop(container_id, None):
+            await sampler.stop()
 
-        thread = threading.Thread(target=events)
-        thread.start()
-        self.logger.debug("Events listener thread started")
+    async def _init(self):
+        if self._capabilities is None:
+            self._set_capabilities(await async_probe_engine(self._docker))
+        self.instrumentation.counters["full_resyncs"] += 1
+        with self.instrumentation.timer("init.list"):
+            containers = await self._get_container_list()
+        await self._close_monitors()
+        self._containers.replace(containers)
+        for container in containers:
+            # don't open hundreds of streams at once
+            self._start_monitor(container, len(self._monitors) * STREAM_START_SPREAD)
+
+    async def _apply_event(self, evt: dict[str, Any]) -> None:
+        """Apply a container event to the affected container only."""
+        self.instrumentation.counters["event_updates"] += 1
+        container_id = evt["Actor"]["ID"]
+        attributes = evt["Actor"].get("Attributes", {})
+        if evt["Action"] == "destroy" or not self._filter.matches(
+            attributes.get("name", ""), attributes.get("image", ""), attributes
+        ):
+            # gone, or not monitored, maybe since renamed
+            self._containers.remove(container_id)
+            await self._stop_monitor(container_id)
+            return
+        if evt["Action"].startswith(STATE_EVENTS):
+            self._apply_state_event(container_id, evt["Action"])
+            return
 
-    async def _refresh(self):
-        containers_data = {container.name: {} for container in self._containers}
         try:
-            for container, stats in self._monitors.items():
-                containers_data[container.name]["id"] = container.attrs["Id"]
-                containers_data[container.name]["status"] = container.status
-
-                if container.status == "running":
-                    containers_data[container.name][
-                        "started_at"
-                    ] = DockerMonitorCoordinator._to_date(
-                        container.attrs["State"]["StartedAt"]
-                    )
-
-                    stat = DockerMonitorCoordinator._skip_old_stat(stats)
-
-                    if stat:
-                        cpu_new = DockerMonitorCoordinator._cpu_compute(
-                            self._old_data.get(container.name, {}).get("cpu", {}), stat
-                        )
-                        mem_new = DockerMonitorCoordinator._mem_compute(stat)
-                        net_new = DockerMonitorCoordinator._network_compute(
-                            self._old_data.get(container.name, {}).get("net", {}), stat
-                        )
-                        containers_data[container.name]["cpu"] = cpu_new
-                        containers_data[container.name]["mem"] = mem_new
-                        containers_data[container.name]["net"] = net_new
-
-            _LOGGER.debug("new data are %s", containers_data)
-            self._old_data = containers_data
-
-        except Exception:  # pylint: disable=broad-except
-            await self._refresh_docker_client()
-            await self._init()
-            raise
-        return containers_data
-
-    @staticmethod
-    def _skip_old_stat(stats):
-        for stat in stats:
-            now = datetime.now(tz=timezone.utc).replace(microsecond=0)
-            update = DockerMonitorCoordinator._to_date(stat["read"]).replace(
-                microsecond=0
+            container = await self._docker.inspect(container_id)
+        except DockerEngineError as err:
+            if err.unreachable:
+                # replayed when the events stream reconnects
+                raise
+            # already gone
+            self.logger.debug("Cannot inspect %s: %s", container_id, err)
+            self._containers.remove(container_id)
+            await self._stop_monitor(container_id)
+            return
+
+        previous = self._containers.upsert(container)
+        if previous and (snapshot := self._event_snapshot(container_id)):
+            # restarts of the restart policy
+            snapshot.restarts += max(
+                container.get("RestartCount", 0) - previous.get("RestartCount", 0), 0
             )
-            if now == update:
-                return stat
-
-    @staticmethod
-    def _cpu_compute(cpu_old, stat):
-        cpu_new = {
-            "container": stat["cpu_stats"]["cpu_usage"]["total_usage"],
-            "system": stat["cpu_stats"]["system_cpu_usage"],
-        }
-
-        cpu_pct = 0
-        if cpu_old:
-            cpu_delta = float(cpu_new["container"] - cpu_old["container"])
-            system_delta = float(cpu_new["system"] - cpu_old["system"])
-
-            if cpu_delta > 0 and system_delta > 0:
-                cpu_pct = (
-                    (cpu_delta / system_delta)
-                    * float(stat["cpu_stats"]["online_cpus"])
-                    * 100.0
+        if self._needs_stats(container):
+            self._start_monitor(container)
+        else:
+            await self._stop_monitor(container_id)
+
+    def _apply_state_event(self, container_id: str, action: str) -> None:
+        """Update the health or the counters of a container from an event."""
+        if (attrs := self._containers.get(container_id)) is None:
+            return
+        if action.startswith("health_status"):
+            state = attrs["State"]
+            state["Health"] = {
+                **(state.get("Health") or {}),
+                "Status": action.partition(":")[2].strip(),
+            }
+        elif snapshot := self._event_snapshot(container_id):
+            if action == "oom":
+                snapshot.oom_kills += 1
+            else:
+                # restarted by the user, the restart policy doesn't send it
+                snapshot.restarts += 1
+
+    def _event_snapshot(self, container_id: str) -> ContainerSnapshot | None:
+        """Return the snapshot of a known container, to count its events."""
+        if (attrs := self._containers.get(container_id)) is None:
+            return None
+        snapshot = self._snapshots.get(container_name(attrs))
+        return snapshot if snapshot and snapshot.id == container_id else None
+
+    async def _start_listening_events(self) -> None:
+        if self._events_task is None:
+            self._events_task = self.hass.async_create_background_task(
+                self._listen_events(), name=f"docker_monitor events {self._url}"
+            )
+            self.logger.debug("Events listener task started")
+
+    async def _listen_events(self) -> None:
+        """Apply events as they come, reconnecting with backoff when the stream ends.
+
+        On reconnection, the engine replays the events missed since the last one.
+        """
+        delay = EVENTS_RETRY_MIN
+        while True:
+            opened = time.time()
+            try:
+                async for evt in self._docker.events(
+                    filters={**EVENTS_FILTERS, **self._filter.event_filters()},
+                    since=self._events_since,
+                ):
+                    self.logger.debug("Received event %s", evt)
+                    delay = EVENTS_RETRY_MIN
+                    if self._event_applied(evt):
+                        continue
+                    try:
+                        await self._apply_event(evt)
+                    except DockerEngineError:
+                        raise
+                    except Exception:  # pylint: disable=broad-except
+                        # skip it rather than replaying it forever, the next
+                        # refresh lists the engine again
+                        self.logger.exception("Unexpected error applying %s", evt)
+                        self._needs_resync = True
+                    self._mark_event_applied(evt)
+                    await self.async_request_refresh()
+                self.logger.debug("Events stream of %s ended", self._url)
+            except DockerEngineError as err:
+                self.instrumentation.counters["events_failures"] += 1
+                log = (
+                    self.logger.warning if delay == EVENTS_RETRY_MIN else _LOGGER.debug
                 )
+                log("Event listening failed: %s", err)
+            except Exception:  # pylint: disable=broad-except
+                self.logger.exception("Unexpected error while applying events")
+
+            if self._events_since is None:
+                # no engine timestamp yet, replay a few seconds before the stream
+                self._events_since = str(int(opened) - EVENTS_REPLAY_MARGIN)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, EVENTS_RETRY_MAX)
+            self.instrumentation.counters["events_reconnects"] += 1
+
+    def _event_applied(self, evt: dict[str, Any]) -> bool:
+        """Return whether an event replayed on reconnection was already applied.
+
+        The engine replays the events from the `since` time included, the counters
+        must not count them twice.
+        """
+        nanos = evt["timeNano"]
+        return nanos < self._events_nanos or (
+            nanos == self._events_nanos
+            and (evt["Actor"]["ID"], evt["Action"]) in self._events_applied
+        )
 
-        cpu_new["percentage"] = cpu_pct
-        return cpu_new
-
-    @staticmethod
-    def _mem_compute(stat):
-        mem = {
-            "usage": float(stat["memory_stats"]["usage"])
-            - float(stat["memory_stats"]["stats"]["inactive_file"]),
-            "max": float(stat["memory_stats"]["limit"]),
-        }
-
-        mem["percentage"] = (mem["usage"] / mem["max"]) * 100
-        return mem
+    def _mark_event_applied(self, evt: dict[str, Any]) -> None:
+        nanos = evt["timeNano"]
+        if nanos != self._events_nanos:
+            self._events_nanos = nanos
+            self._events_applied = set()
+        self._events_applied.add((evt["Actor"]["ID"], evt["Action"]))
+        self._events_since = f"{nanos // 10**9}.{nanos % 10**9:09d}"
+
+    async def _get_one_shot_stats(
+        self, now: float
+    ) -> tuple[dict[str, dict[str, Any]], set[str]]:
+        """Fetch a single stats frame of the running containers due, in parallel.
+
+        Return the frames and the names of the containers which failed.
+        """
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+
+        async def get_stats(container: dict[str, Any]) -> dict[str, Any] | None:
+            async with semaphore:
+                if not self._breaker.allow():
+                    return None
+                try:
+                    with self.instrumentation.timer("refresh.stats_per_container"):
+                        stat = await self._docker.stats(
+                            container["Id"], one_shot=self._one_shot
+                        )
+                except DockerEngineError as err:
+                    self.instrumentation.counters["failed_stats"] += 1
+                    _LOGGER.debug("Cannot get stats of %s: %s", container["Id"], err)
+                    self._record_call(err)
+                    return None
+                self._record_call(None)
+                return stat
 
-    @staticmethod
-    def _network_compute(net_old, stat):
-        net_new = {
-            "interfaces": {},
-            "total": {"tx_bytes": 0, "rx_bytes": 0, "speed_tx": 0, "speed_rx": 0},
-            "last_update": DockerMonitorCoordinator._to_date(stat["read"]),
+        running = self._sampled_containers()
+        due = {
+            running[container_id]: self._containers.get(container_id)
+            for container_id in self._scheduler.due(running, now)
         }
+        stats = await asyncio.gather(*(get_stats(c) for c in due.values()))
+        if not self._breaker.allow():
+            raise UpdateFailed(f"{self._url} doesn't answer")
+        return (
+            {name: stat for name, stat in zip(due, stats) if stat},
+            {name for name, stat in zip(due, stats) if not stat},
+        )
 
-        for if_name, network_stat in stat["networks"].items():
-            net_new["interfaces"][if_name] = {}
-            net_new["interfaces"][if_name]["tx_bytes"] = network_stat["tx_bytes"]
-            net_new["interfaces"][if_name]["rx_bytes"] = network_stat["rx_bytes"]
-            net_new["total"]["tx_bytes"] += network_stat["tx_bytes"]
-            net_new["total"]["rx_bytes"] += network_stat["rx_bytes"]
-
-        if net_old:
-            delta_tx = net_new["total"]["tx_bytes"] - net_old["total"]["tx_bytes"]
-            delta_rx = net_new["total"]["rx_bytes"] - net_old["total"]["rx_bytes"]
-            time = (net_new["last_update"] - net_old["last_update"]).total_seconds()
-            net_new["total"]["speed_tx"] = delta_tx / time
-            net_new["total"]["speed_rx"] = delta_rx / time
-
-            for if_name, intf in net_new["interfaces"].items():
-                delta_tx = intf["tx_bytes"] - net_old["interfaces"][if_name]["tx_bytes"]
-                delta_rx = intf["rx_bytes"] - net_old["interfaces"][if_name]["rx_bytes"]
-
-                intf["speed_tx"] = delta_tx / time
-                intf["speed_rx"] = delta_rx / time
-
-        return net_new
-
-    @staticmethod
-    def _to_date(date_str: str) -> datetime:
-        to_parse = date_str[:-4] + date_str[-1:]
-        to_parse = to_parse.replace('.Z', '.0Z')
-        return datetime.strptime(to_parse, "%Y-%m-%dT%H:%M:%S.%fZ").replace(
-            tzinfo=timezone.utc
+    async def _get_cgroup_stats(
+        self,
+    ) -> tuple[dict[str, dict[str, Any]], set[str]]:
+        """Read a stats frame of every running container from its cgroup.
+
+        Return the frames and the names of the containers which failed.
+        """
+        assert self._cgroup is not None
+        running = self._sampled_containers()
+        frames = await self.hass.async_add_executor_job(
+            self._cgroup.read_all, [self._containers.get(c_id) for c_id in running]
         )
+        stats = {}
+        failed = set()
+        for container_id, frame in frames.items():
+            if frame is None:
+                self.instrumentation.counters["failed_stats"] += 1
+                failed.add(running[container_id])
+            else:
+                stats[running[container_id]] = frame
+        return stats, failed
+
+    async def _refresh(self) -> dict[str, ContainerSnapshot]:
+        with self.instrumentation.timer("refresh"):
+            return await self._refresh_timed()
+
+    async def _refresh_timed(self) -> dict[str, ContainerSnapshot]:
+        """Refresh, unless the circuit breaker of the engine is open.
+
+        Failures of single containers don't fail the refresh.
+        """
+        if not self._breaker.allow():
+            raise UpdateFailed(
+                f"{self._url} doesn't answer, "
+                f"next try in {math.ceil(self._breaker.retry_in())} seconds"
+            )
+        try:
+            async with async_timeout.timeout(self._timeout):
+                return await self._refresh_engine()
+        except DockerEngineError as err:
+            self._record_call(err)
+            raise UpdateFailed(str(err)) from err
+        except asyncio.TimeoutError as err:
+            self._record_call(err)
+            raise
+
+    async def _refresh_engine(self) -> dict[str, ContainerSnapshot]:
+        if not self._stopped and (self._needs_resync or self._breaker.is_open):
+            # the engine may have restarted while it didn't answer, a stopped
+            # coordinator doesn't rebuild its client nor start samplers
+            await self._resync()
+
+        now = time.monotonic()
+        with self.instrumentation.timer("refresh.stats"):
+            if self._stats_mode == STATS_MODE_STREAM:
+                stats = {}
+                failed = set()
+                for name, container in self._containers.items():
+                    sampler = self._monitors.get(container["Id"])
+                    if sampler is None:
+                        continue
+                    if sampler.failing:
+                        failed.add(name)
+                    elif stat := sampler.take():
+                        stats[name] = stat
+            elif self._cgroup:
+                stats, failed = await self._get_cgroup_stats()
+            else:
+                stats, failed = await self._get_one_shot_stats(now)
+
+        with self.instrumentation.timer("refresh.compute"):
+            snapshots: dict[str, ContainerSnapshot] = {}
+            totals = HostTotals()
+            for name, container in self._containers.items():
+                snapshot = self._snapshots.get(name)
+                if snapshot is None or snapshot.id != container["Id"]:
+                    snapshot = ContainerSnapshot(container["Id"])
+                snapshot.update_state(container)
+                running = snapshot.status == "running"
+                if running and (stat := stats.get(name)):
+                    previous = snapshot.usage()
+                    try:
+                        snapshot.update_stats(stat, self._families.of(name))
+                    except (KeyError, TypeError, ValueError, ZeroDivisionError) as err:
+                        _LOGGER.debug("Invalid stats frame of %s: %s", name, err)
+                        self.instrumentation.counters["failed_stats"] += 1
+                        failed.add(name)
+                if running and name in failed:
+                    # only this container is unavailable, retried with backoff
+                    snapshot.available = False
+                    if self._stats_mode == STATS_MODE_ONE_SHOT:
+                        self._scheduler.failed(snapshot.id, now)
+                elif running and stat:
+                    if self._stats_mode == STATS_MODE_ONE_SHOT:
+                        self._scheduler.sampled(
+                            snapshot.id,
+                            is_volatile(previous, snapshot.usage()),
+                            now,
+                        )
+                    if self._windows:
+                        snapshot.record_windows(self._windows, now)
+                    if self.exporter and self._stats_mode != STATS_MODE_STREAM:
+                        self.exporter.update(name, snapshot)
+                elif snapshot.windows:
+                    snapshot.expire_windows(now)
+                snapshots[name] = snapshot
+                totals.add(snapshot)
+
+            _LOGGER.debug("new data are %s", snapshots)
+            self._snapshots = snapshots
+            self.totals = totals
+            if self.exporter:
+                self.exporter.retain(snapshots)
+            self._changed = self._detect_changes(snapshots)
+        return snapshots
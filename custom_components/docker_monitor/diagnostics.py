@@ -0,0 +1,29 @@
+"""Diagnostics support for docker_monitor."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_URL
+from homeassistant.core import HomeAssistant
+
+from .const import CONF_CAPABILITIES, CONF_URLS, DOMAIN, HUB
+from .hub import DockerMonitorHub
+
+# URLs may carry credentials, capabilities are keyed by URL and describe the engine
+TO_REDACT = {CONF_URL, CONF_URLS, CONF_CAPABILITIES}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    hub: DockerMonitorHub = hass.data[DOMAIN][entry.entry_id][HUB]
+    return async_redact_data(
+        {
+            "entry": {"data": dict(entry.data), "options": dict(entry.options)},
+            **hub.diagnostics(),
+        },
+        TO_REDACT,
+    )
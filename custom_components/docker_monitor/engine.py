@@ -0,0 +1,360 @@
+"""Docker Engine API clients."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator
+from functools import partial
+import json
+import logging
+from typing import Any
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+
+_LOGGER = logging.getLogger(__name__)
+
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=30)
+# the disk usage scans all images and volumes, it can take minutes on big hosts
+DISK_USAGE_TIMEOUT = aiohttp.ClientTimeout(total=600)
+STREAM_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=None)
+# stop and restart answer once the container stopped, after its grace period
+ACTION_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=30)
+
+# URL schemes the native client can talk to, other schemes go through docker-py
+NATIVE_SCHEMES = ("unix", "tcp", "http", "https")
+
+
+class DockerEngineError(HomeAssistantError):
+    """Error raised when the docker engine can't be reached or rejects a call."""
+
+    def __init__(self, message: str, status: int | None = None) -> None:
+        """Init, status is the HTTP status of a call the engine rejected."""
+        super().__init__(message)
+        self.status = status
+
+    @property
+    def unreachable(self) -> bool:
+        """Return whether the engine didn't answer, rather than rejected the call."""
+        return self.status is None
+
+
+def create_engine_client(
+    hass: HomeAssistant, url: str, session: aiohttp.ClientSession | None = None
+) -> DockerEngineClient:
+    """Create the cheapest client able to talk to the engine behind url.
+
+    A session given is shared by TCP engines, unix sockets get their own pool.
+    """
+    scheme = urlsplit(url).scheme
+    if scheme in NATIVE_SCHEMES:
+        return DockerEngineClient(url, None if scheme == "unix" else session)
+    _LOGGER.debug("No native transport for %s, falling back to docker-py", url)
+    return DockerPyEngineClient(hass, url)
+
+
+class DockerEngineClient:
+    """Asyncio docker engine client speaking the HTTP API directly.
+
+    All calls share a single connection pool, responses are the raw engine JSON.
+    The pool is closed with the client, unless it was given to it.
+    """
+
+    def __init__(self, url: str, session: aiohttp.ClientSession | None = None) -> None:
+        """Init."""
+        self._url = url
+        self._session = session
+        self._owns_session = session is None
+        self._closed = False
+        parts = urlsplit(url)
+        if parts.scheme == "unix":
+            self._socket: str | None = parts.path
+            self._base = "http://localhost"
+        else:
+            self._socket = None
+            scheme = "https" if parts.scheme == "https" else "http"
+            self._base = f"{scheme}://{parts.netloc}"
+
+    @property
+    def url(self) -> str:
+        """Return the engine url."""
+        return self._url
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._closed:
+            raise DockerEngineError(f"Client of {self._url} is closed")
+        if self._session is None or self._session.closed:
+            # streams hold a connection each, don't let them starve other calls
+            connector: aiohttp.BaseConnector
+            if self._socket:
+                connector = aiohttp.UnixConnector(path=self._socket, limit=0)
+            else:
+                connector = aiohttp.TCPConnector(limit=0)
+            self._session = aiohttp.ClientSession(connector=connector)
+            self._owns_session = True
+        return self._session
+
+    async def close(self) -> None:
+        """Close the connection pool."""
+        self._closed = True
+        if self._session is not None and self._owns_session:
+            await self._session.close()
+        self._session = None
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        params: dict[str, Any] | None = None,
+        timeout: aiohttp.ClientTimeout = REQUEST_TIMEOUT,
+    ) -> Any:
+        try:
+            async with self._get_session().request(
+                method,
+                self._base + path,
+                params=_to_params(params),
+                timeout=timeout,
+            ) as resp:
+                if resp.status >= 400:
+                    raise DockerEngineError(
+                        f"{method} {path} failed ({resp.status}): {await resp.text()}",
+                        resp.status,
+                    )
+                if resp.content_type == "application/json":
+                    return await resp.json()
+                return await resp.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+            raise DockerEngineError(f"{method} {path} failed: {err}") from err
+
+    async def _stream(
+        self, path: str, params: dict[str, Any] | None = None
+    ) -> AsyncIterator[dict[str, Any]]:
+        try:
+            async with self._get_session().get(
+                self._base + path, params=_to_params(params), timeout=STREAM_TIMEOUT
+            ) as resp:
+                if resp.status >= 400:
+                    raise DockerEngineError(
+                        f"GET {path} failed ({resp.status}): {await resp.text()}",
+                        resp.status,
+                    )
+                async for line in resp.content:
+                    if line.strip():
+                        yield json.loads(line)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+            raise DockerEngineError(f"GET {path} failed: {err}") from err
+
+    async def ping(self) -> None:
+        """Check the engine answers."""
+        await self._request("GET", "/_ping")
+
+    async def version(self) -> dict[str, Any]:
+        """Get the versions of the engine and of its API."""
+        return await self._request("GET", "/version")
+
+    async def info(self) -> dict[str, Any]:
+        """Get the system information of the engine."""
+        return await self._request("GET", "/info")
+
+    async def disk_usage(self) -> dict[str, Any]:
+        """Get the disk used by images, containers, volumes and build cache."""
+        return await self._request("GET", "/system/df", timeout=DISK_USAGE_TIMEOUT)
+
+    async def containers(
+        self, all_: bool = True, filters: dict[str, list[str]] | None = None
+    ) -> list[dict[str, Any]]:
+        """List containers."""
+        return await self._request(
+            "GET", "/containers/json", {"all": all_, "filters": filters}
+        )
+
+    async def inspect(self, container_id: str) -> dict[str, Any]:
+        """Inspect a container."""
+        return await self._request("GET", f"/containers/{container_id}/json")
+
+    async def stats(self, container_id: str, one_shot: bool = False) -> dict[str, Any]:
+        """Get a single stats frame.
+
+        With one_shot, the engine answers right away without filling `precpu_stats`.
+        """
+        return await self._request(
+            "GET",
+            f"/containers/{container_id}/stats",
+            {"stream": False, "one-shot": one_shot or None},
+        )
+
+    def stats_stream(self, container_id: str) -> AsyncIterator[dict[str, Any]]:
+        """Stream stats frames, one per second."""
+        return self._stream(f"/containers/{container_id}/stats", {"stream": True})
+
+    async def start(self, container_id: str) -> None:
+        """Start a container."""
+        await self._request("POST", f"/containers/{container_id}/start")
+
+    async def stop(self, container_id: str, timeout: int | None = None) -> None:
+        """Stop a container, killing it after timeout seconds if given."""
+        await self._request(
+            "POST",
+            f"/containers/{container_id}/stop",
+            {"t": timeout},
+            timeout=ACTION_TIMEOUT,
+        )
+
+    async def restart(self, container_id: str, timeout: int | None = None) -> None:
+        """Restart a container, killing it after timeout seconds if given."""
+        await self._request(
+            "POST",
+            f"/containers/{container_id}/restart",
+            {"t": timeout},
+            timeout=ACTION_TIMEOUT,
+        )
+
+    async def kill(self, container_id: str, signal: str | None = None) -> None:
+        """Send a signal to a container, SIGKILL by default."""
+        await self._request(
+            "POST", f"/containers/{container_id}/kill", {"signal": signal}
+        )
+
+    def events(
+        self, filters: dict[str, list[str]] | None = None, since: str | None = None
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Stream engine events, starting with the ones after since if given.
+
+        since is a unix timestamp, with optional nanoseconds after a dot.
+        """
+        return self._stream("/events", {"filters": filters, "since": since})
+
+
+class DockerPyEngineClient(DockerEngineClient):
+    """Fallback client running docker-py's low level API in the executor."""
+
+    def __init__(self, hass: HomeAssistant, url: str) -> None:
+        """Init."""
+        super().__init__(url)
+        self._hass = hass
+        self._api: Any = None
+
+    async def _call(self, func_name: str, *args: Any, **kwargs: Any) -> Any:
+        # pylint: disable=import-outside-toplevel
+        from docker.errors import DockerException
+        from requests import RequestException
+
+        try:
+            if self._api is None:
+                self._api = await self._hass.async_add_executor_job(self._create_api)
+            return await self._hass.async_add_executor_job(
+                partial(getattr(self._api, func_name), *args, **kwargs)
+            )
+        except (DockerException, RequestException) as err:
+            raise DockerEngineError(
+                f"{func_name} failed: {err}", getattr(err, "status_code", None)
+            ) from err
+
+    def _create_api(self) -> Any:
+        from docker import APIClient  # pylint: disable=import-outside-toplevel
+
+        return APIClient(base_url=self._url)
+
+    async def _iterate(self, func_name: str, **kwargs: Any) -> AsyncIterator[Any]:
+        # pylint: disable=import-outside-toplevel
+        from docker.errors import DockerException
+        from requests import RequestException
+
+        generator = await self._call(func_name, **kwargs)
+        try:
+            while (
+                item := await self._hass.async_add_executor_job(next, generator, None)
+            ) is not None:
+                yield item
+        except (DockerException, RequestException) as err:
+            raise DockerEngineError(
+                f"{func_name} stream failed: {err}", getattr(err, "status_code", None)
+            ) from err
+        finally:
+            await self._hass.async_add_executor_job(generator.close)
+
+    async def close(self) -> None:
+        """Close the underlying docker-py client."""
+        if self._api is not None:
+            await self._hass.async_add_executor_job(self._api.close)
+            self._api = None
+
+    async def ping(self) -> None:
+        """Check the engine answers."""
+        await self._call("ping")
+
+    async def version(self) -> dict[str, Any]:
+        """Get the versions of the engine and of its API."""
+        return await self._call("version")
+
+    async def info(self) -> dict[str, Any]:
+        """Get the system information of the engine."""
+        return await self._call("info")
+
+    async def disk_usage(self) -> dict[str, Any]:
+        """Get the disk used by images, containers, volumes and build cache."""
+        return await self._call("df")
+
+    async def containers(
+        self, all_: bool = True, filters: dict[str, list[str]] | None = None
+    ) -> list[dict[str, Any]]:
+        """List containers."""
+        return await self._call("containers", all=all_, filters=filters)
+
+    async def inspect(self, container_id: str) -> dict[str, Any]:
+        """Inspect a container."""
+        return await self._call("inspect_container", container_id)
+
+    async def stats(self, container_id: str, one_shot: bool = False) -> dict[str, Any]:
+        """Get a single stats frame.
+
+        docker-py 6.0 has no one_shot, the engine waits for a second frame.
+        """
+        return await self._call("stats", container_id, stream=False)
+
+    def stats_stream(self, container_id: str) -> AsyncIterator[dict[str, Any]]:
+        """Stream stats frames, one per second."""
+        return self._iterate("stats", container=container_id, decode=True, stream=True)
+
+    async def start(self, container_id: str) -> None:
+        """Start a container."""
+        await self._call("start", container_id)
+
+    async def stop(self, container_id: str, timeout: int | None = None) -> None:
+        """Stop a container, killing it after timeout seconds if given."""
+        await self._call("stop", container_id, timeout=timeout)
+
+    async def restart(self, container_id: str, timeout: int | None = None) -> None:
+        """Restart a container, killing it after timeout seconds if given."""
+        # docker-py adds the timeout to the connection timeout, it can't be None
+        kwargs = {} if timeout is None else {"timeout": timeout}
+        await self._call("restart", container_id, **kwargs)
+
+    async def kill(self, container_id: str, signal: str | None = None) -> None:
+        """Send a signal to a container, SIGKILL by default."""
+        await self._call("kill", container_id, signal=signal)
+
+    def events(
+        self, filters: dict[str, list[str]] | None = None, since: str | None = None
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Stream engine events, starting with the ones after since if given."""
+        return self._iterate("events", decode=True, filters=filters, since=since)
+
+
+def _to_params(params: dict[str, Any] | None) -> dict[str, str] | None:
+    """Encode query parameters the way the engine expects them."""
+    if params is None:
+        return None
+    encoded = {}
+    for key, value in params.items():
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            encoded[key] = "true" if value else "false"
+        elif isinstance(value, (dict, list)):
+            encoded[key] = json.dumps(value)
+        else:
+            encoded[key] = str(value)
+    return encoded
@@ -1,27 +1,110 @@
 """Abstract entity definition."""
+from collections.abc import Callable
+from functools import partial
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import EntityCategory
-from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.entity import DeviceInfo, Entity
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.util import slugify
 
-from . import DOMAIN, DockerMonitorCoordinator
+from . import DOMAIN, DockerMonitorCoordinator, DockerMonitorHub
+from .const import ATTR_WINDOWS, SIGNAL_CONTAINER_ADDED
+from .model import ContainerSnapshot
+
+# metrics of the stats of a container, unavailable while they can't be sampled
+STATS_METRICS = ("cpu.", "mem.", "net.")
+
+
+@callback
+def async_setup_container_entities(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    hub: DockerMonitorHub,
+    async_add_entities: AddEntitiesCallback,
+    create: Callable[[DockerMonitorCoordinator, str], list[Entity]],
+) -> None:
+    """Add the entities of the containers of all hosts, and of the ones appearing."""
+
+    @callback
+    def async_add_container(
+        coordinator: DockerMonitorCoordinator, container_name: str
+    ) -> None:
+        async_add_entities(create(coordinator, container_name))
+
+    entities: list[Entity] = []
+    for coordinator in hub.coordinators:
+        for container_name in coordinator.data or {}:
+            entities.extend(create(coordinator, container_name))
+        entry.async_on_unload(
+            async_dispatcher_connect(
+                hass,
+                SIGNAL_CONTAINER_ADDED.format(coordinator.host_id),
+                partial(async_add_container, coordinator),
+            )
+        )
+    async_add_entities(entities)
 
 
 class DockerMonitorEntity(CoordinatorEntity):
     """Docker monitor sensor entity."""
 
+    # rolling-window aggregates are derived from the states, don't record them, the
+    # recorder only honors explicit attribute names, from Home Assistant 2023.9
+    _unrecorded_attributes = frozenset({ATTR_WINDOWS})
+
     def __init__(
-        self, coordinator: DockerMonitorCoordinator, container_name, entity_name
+        self,
+        coordinator: DockerMonitorCoordinator,
+        container_name,
+        entity_name,
+        metric: str | None = None,
     ) -> None:
         """Init."""
         super().__init__(coordinator)
         self._container_name = container_name
+        self._metric = metric
 
         name = slugify(f"{container_name}_{entity_name}")
-        self._c_id = coordinator.data[container_name]["id"]
-        self.entity_id = f"sensor.{name}"
+        self._c_id = coordinator.data[container_name].id
+        self.entity_id = f"sensor.{slugify(f'{coordinator.prefix}_{name}')}"
         self._attr_unique_id = slugify(f"{DOMAIN}_{self._c_id}_{name}")
 
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write the state only when the value of the entity changed."""
+        if self.coordinator.has_changed(self._container_name, self._metric):
+            super()._handle_coordinator_update()
+
+    @property
+    def available(self) -> bool:
+        """Return whether the host answers and the metric could be sampled."""
+        if not super().available:
+            return False
+        snapshot = self._snapshot
+        return (
+            snapshot is None
+            or snapshot.available
+            or not (self._metric or "").startswith(STATS_METRICS)
+        )
+
+    @property
+    def _snapshot(self) -> ContainerSnapshot | None:
+        """Return the last snapshot of the container."""
+        return self.coordinator.data.get(self._container_name)
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        """Return the rolling-window aggregates of the metric, if any."""
+        snapshot = self._snapshot
+        if snapshot and (windows := snapshot.windows.get(self._metric or "")):
+            return {ATTR_WINDOWS: windows.as_dict()}
+        return None
+
     @property
     def entity_category(self) -> EntityCategory | None:
         """Return the category of the entity, if any."""
@@ -35,3 +118,28 @@ class DockerMonitorEntity(CoordinatorEntity):
             name=self._container_name,
             manufacturer="Docker",
         )
+
+
+class DockerHostEntity(CoordinatorEntity):
+    """Entity of the docker host device."""
+
+    def __init__(self, coordinator: DockerMonitorCoordinator, entity_name) -> None:
+        """Init."""
+        super().__init__(coordinator)
+        name = slugify(f"docker_monitor_{coordinator.prefix}_{entity_name}")
+        self.entity_id = f"sensor.{name}"
+        self._attr_unique_id = slugify(f"{coordinator.host_id}_{name}")
+
+    @property
+    def entity_category(self) -> EntityCategory | None:
+        """Return the category of the entity, if any."""
+        return EntityCategory.DIAGNOSTIC
+
+    @property
+    def device_info(self) -> DeviceInfo:
+        """Return device specific attributes."""
+        return DeviceInfo(
+            identifiers={(DOMAIN, self.coordinator.host_id)},
+            name=f"Docker {self.coordinator.host_name}",
+            manufacturer="Docker",
+        )
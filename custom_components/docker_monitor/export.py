@@ -0,0 +1,261 @@
+"""Export of the latest container samples, apart from the entity states.
+
+Samples are served as Prometheus text and pushed to websocket subscribers, so that
+1 second stats don't go through the state machine and the recorder.
+"""
+from __future__ import annotations
+
+from collections.abc import Callable, Collection, Iterable
+from http import HTTPStatus
+from typing import Any
+
+from aiohttp import web
+import voluptuous as vol
+
+from homeassistant.components import websocket_api
+from homeassistant.components.http import HomeAssistantView
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+
+from .const import DOMAIN, HUB
+from .families import STATS_FAMILIES
+from .model import ContainerSnapshot
+
+# seconds between two pushes of the changed samples to the subscribers
+PUSH_INTERVAL = 1.0
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# name, type, help and value of the exported metrics
+METRICS: tuple[tuple[str, str, str, Callable[[ContainerSnapshot], Any]], ...] = (
+    (
+        "docker_monitor_cpu_percent",
+        "gauge",
+        "CPU used by the container, in percent of the host CPU.",
+        lambda s: s.cpu and s.cpu.percentage,
+    ),
+    (
+        "docker_monitor_cpu_usage_seconds_total",
+        "counter",
+        "CPU time used by the container.",
+        lambda s: s.cpu and s.cpu.container / 1e9,
+    ),
+    (
+        "docker_monitor_memory_usage_bytes",
+        "gauge",
+        "Memory used by the container, without the page cache.",
+        lambda s: s.mem and s.mem.usage,
+    ),
+    (
+        "docker_monitor_memory_limit_bytes",
+        "gauge",
+        "Memory limit of the container.",
+        lambda s: s.mem and s.mem.max,
+    ),
+    (
+        "docker_monitor_network_receive_bytes_total",
+        "counter",
+        "Bytes received by the container on all its interfaces.",
+        lambda s: s.net and s.net.total.rx_bytes,
+    ),
+    (
+        "docker_monitor_network_transmit_bytes_total",
+        "counter",
+        "Bytes sent by the container on all its interfaces.",
+        lambda s: s.net and s.net.total.tx_bytes,
+    ),
+)
+_HEADERS = [
+    f"# HELP {name} {help_}\n# TYPE {name} {type_}\n".encode()
+    for name, type_, help_, _ in METRICS
+]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class SampleExporter:
+    """Latest samples of the containers of a host, rendered once per sample.
+
+    Each sample is rendered when it is received, a scrape only joins the cached
+    lines. Samples come from the stats streams, each second, or from refreshes.
+    """
+
+    def __init__(self, hass: HomeAssistant, host: str) -> None:
+        """Init."""
+        self._hass = hass
+        self._host = host
+        # container name -> snapshot computing the rates between stream frames
+        self._streamed: dict[str, ContainerSnapshot] = {}
+        # container name -> lines of each metric
+        self._lines: dict[str, list[bytes]] = {}
+        self._samples: dict[str, dict[str, Any]] = {}
+        self._listeners: list[Callable[[list[dict[str, Any]]], None]] = []
+        # samples changed since the last push
+        self._pending: dict[str, dict[str, Any]] = {}
+        self._unsub_push: Any = None
+
+    @callback
+    def update_frame(
+        self,
+        name: str,
+        container_id: str,
+        frame: dict[str, Any],
+        families: Collection[str] = STATS_FAMILIES,
+    ) -> None:
+        """Update a container from a frame of its stats stream."""
+        snapshot = self._streamed.get(name)
+        if snapshot is None or snapshot.id != container_id:
+            snapshot = self._streamed[name] = ContainerSnapshot(container_id)
+        try:
+            snapshot.update_stats(frame, families)
+        except (KeyError, TypeError, ValueError, ZeroDivisionError):
+            return
+        self.update(name, snapshot)
+
+    @callback
+    def update(self, name: str, snapshot: ContainerSnapshot) -> None:
+        """Update a container from its last snapshot."""
+        labels = f'{{host="{_escape(self._host)}",container="{_escape(name)}"}}'
+        lines = []
+        for metric, _, _, value in METRICS:
+            measure = value(snapshot)
+            lines.append(
+                b"" if measure is None else f"{metric}{labels} {measure}\n".encode()
+            )
+        self._lines[name] = lines
+        self._samples[name] = sample = {
+            "host": self._host,
+            "container": name,
+            "read": snapshot.sampled_at and snapshot.sampled_at.isoformat(),
+            "cpu_percentage": snapshot.cpu and snapshot.cpu.percentage,
+            "memory_usage": snapshot.mem and snapshot.mem.usage,
+            "memory_limit": snapshot.mem and snapshot.mem.max,
+            "speed_rx": snapshot.net and snapshot.net.total.speed_rx,
+            "speed_tx": snapshot.net and snapshot.net.total.speed_tx,
+        }
+        if self._listeners:
+            self._pending[name] = sample
+            if self._unsub_push is None:
+                self._unsub_push = self._hass.loop.call_later(
+                    PUSH_INTERVAL, self._push
+                ).cancel
+
+    @callback
+    def retain(self, names: Collection[str]) -> None:
+        """Forget the containers no longer monitored."""
+        for name in [name for name in self._lines if name not in names]:
+            self._lines.pop(name)
+            self._samples.pop(name, None)
+            self._streamed.pop(name, None)
+
+    def samples(self) -> list[dict[str, Any]]:
+        """Return the latest sample of each container."""
+        return list(self._samples.values())
+
+    def lines(self, metric: int) -> Iterable[bytes]:
+        """Return the cached lines of a metric, for all containers."""
+        return (lines[metric] for lines in self._lines.values())
+
+    @callback
+    def async_subscribe(
+        self, listener: Callable[[list[dict[str, Any]]], None]
+    ) -> CALLBACK_TYPE:
+        """Push the changed samples to listener, at most each PUSH_INTERVAL."""
+        self._listeners.append(listener)
+
+        @callback
+        def unsubscribe() -> None:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+            if not self._listeners:
+                self._pending.clear()
+
+        return unsubscribe
+
+    @callback
+    def _push(self) -> None:
+        self._unsub_push = None
+        pending = list(self._pending.values())
+        self._pending.clear()
+        for listener in list(self._listeners):
+            listener(pending)
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop pushing samples."""
+        if self._unsub_push:
+            self._unsub_push()
+            self._unsub_push = None
+        self._listeners.clear()
+
+
+def _exporters(hass: HomeAssistant) -> list[SampleExporter]:
+    return [
+        coordinator.exporter
+        for entry_data in hass.data.get(DOMAIN, {}).values()
+        if HUB in entry_data
+        for coordinator in entry_data[HUB].coordinators
+        if coordinator.exporter
+    ]
+
+
+def render_prometheus(exporters: list[SampleExporter]) -> bytes:
+    """Render the samples of all exporters in the Prometheus text format."""
+    chunks: list[bytes] = []
+    for index, header in enumerate(_HEADERS):
+        chunks.append(header)
+        for exporter in exporters:
+            chunks.extend(exporter.lines(index))
+    return b"".join(chunks)
+
+
+class DockerMonitorMetricsView(HomeAssistantView):
+    """Serve the latest container samples to Prometheus."""
+
+    url = "/api/docker_monitor/metrics"
+    name = "api:docker_monitor:metrics"
+
+    async def get(self, request: web.Request) -> web.Response:
+        """Return the samples of the entries exporting them."""
+        hass: HomeAssistant = request.app["hass"]
+        if not (exporters := _exporters(hass)):
+            return self.json_message("No entry exports metrics", HTTPStatus.NOT_FOUND)
+        return web.Response(
+            body=render_prometheus(exporters),
+            headers={"Content-Type": PROMETHEUS_CONTENT_TYPE},
+        )
+
+
+@websocket_api.websocket_command(
+    {vol.Required("type"): "docker_monitor/subscribe_samples"}
+)
+@callback
+def ws_subscribe_samples(
+    hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: dict
+) -> None:
+    """Send the latest samples, then the changed ones each second."""
+
+    @callback
+    def forward(samples: list[dict[str, Any]]) -> None:
+        connection.send_message(
+            websocket_api.event_message(msg["id"], {"samples": samples})
+        )
+
+    exporters = _exporters(hass)
+    unsubs = [exporter.async_subscribe(forward) for exporter in exporters]
+
+    @callback
+    def unsubscribe() -> None:
+        for unsub in unsubs:
+            unsub()
+
+    connection.subscriptions[msg["id"]] = unsubscribe
+    connection.send_result(msg["id"])
+    forward([sample for exporter in exporters for sample in exporter.samples()])
+
+
+@callback
+def async_setup_export(hass: HomeAssistant) -> None:
+    """Register the metrics view and the websocket command."""
+    hass.http.register_view(DockerMonitorMetricsView)
+    websocket_api.async_register_command(hass, ws_subscribe_samples)
@@ -0,0 +1,53 @@
+"""Metric families enabled for each container."""
+from __future__ import annotations
+
+from collections.abc import Iterable
+from fnmatch import fnmatchcase
+
+from .const import FAMILY_CPU, FAMILY_MEMORY, FAMILY_NETWORK, METRIC_FAMILIES
+
+# families computed from the stats of a container
+STATS_FAMILIES = frozenset({FAMILY_CPU, FAMILY_MEMORY, FAMILY_NETWORK})
+
+
+def parse_container_families(value: str) -> list[tuple[str, frozenset[str]]]:
+    """Parse `name: family, family; name: ...` overrides, names can be patterns."""
+    overrides = []
+    for override in value.split(";"):
+        if not override.strip():
+            continue
+        pattern, has_families, families = override.partition(":")
+        if not has_families or not pattern.strip():
+            raise ValueError(f"Expected `name: family, ...`, got {override.strip()}")
+        enabled = frozenset(f.strip() for f in families.split(",") if f.strip())
+        if unknown := enabled.difference(METRIC_FAMILIES):
+            raise ValueError(f"Unknown metric families {', '.join(sorted(unknown))}")
+        overrides.append((pattern.strip(), enabled))
+    return overrides
+
+
+class MetricFamilies:
+    """Families enabled for all containers, unless overridden for some of them.
+
+    The first override whose pattern matches the container name applies.
+    """
+
+    def __init__(
+        self,
+        default: Iterable[str],
+        overrides: list[tuple[str, frozenset[str]]] | None = None,
+    ) -> None:
+        """Init."""
+        self._default = frozenset(default)
+        self._overrides = overrides or []
+
+    def of(self, container_name: str) -> frozenset[str]:
+        """Return the families enabled for a container."""
+        for pattern, families in self._overrides:
+            if fnmatchcase(container_name, pattern):
+                return families
+        return self._default
+
+    def needs_stats(self, container_name: str) -> bool:
+        """Return whether the stats of a container must be collected."""
+        return not self.of(container_name).isdisjoint(STATS_FAMILIES)
@@ -0,0 +1,125 @@
+"""Include and exclude rules selecting the monitored containers."""
+from __future__ import annotations
+
+from collections.abc import Mapping
+from fnmatch import fnmatchcase
+import re
+
+from .registry import COMPOSE_PROJECT_LABEL
+
+RULE_NAME = "name"
+RULE_LABEL = "label"
+RULE_IMAGE = "image"
+RULE_PROJECT = "project"
+RULE_KINDS = (RULE_NAME, RULE_LABEL, RULE_IMAGE, RULE_PROJECT)
+
+
+def parse_rules(value: str) -> list[tuple[str, str]]:
+    """Parse `kind:pattern` rules separated by commas."""
+    rules = []
+    for rule in value.split(","):
+        if not rule.strip():
+            continue
+        kind, _, pattern = rule.strip().partition(":")
+        if kind not in RULE_KINDS or not pattern.strip():
+            raise ValueError(
+                f"Expected {', '.join(RULE_KINDS)} followed by `:pattern`, got {rule}"
+            )
+        rules.append((kind, pattern.strip()))
+    return rules
+
+
+def _glob_to_regex(pattern: str) -> str:
+    """Translate a name pattern to a regular expression the engine understands."""
+    regex = "".join(
+        ".*" if char == "*" else "." if char == "?" else re.escape(char)
+        for char in pattern
+    )
+    # names of the engine start with a slash
+    return f"^/?{regex}$"
+
+
+def _has_wildcards(pattern: str) -> bool:
+    return any(char in pattern for char in "*?[")
+
+
+class ContainerFilter:
+    """Select containers matching one of the include rules and none of the exclude.
+
+    Without include rules, all containers are included. Names and images are
+    matched with `*` wildcards, an image without tag matches all its tags. Labels
+    are given as `key` or `key=value`.
+    """
+
+    def __init__(
+        self, include: list[tuple[str, str]], exclude: list[tuple[str, str]]
+    ) -> None:
+        """Init."""
+        self._include = include
+        self._exclude = exclude
+
+    def matches(self, name: str, image: str, labels: Mapping[str, str]) -> bool:
+        """Return whether a container is monitored."""
+        if self._include and not any(
+            self._rule_matches(rule, name, image, labels) for rule in self._include
+        ):
+            return False
+        return not any(
+            self._rule_matches(rule, name, image, labels) for rule in self._exclude
+        )
+
+    @staticmethod
+    def _rule_matches(
+        rule: tuple[str, str], name: str, image: str, labels: Mapping[str, str]
+    ) -> bool:
+        kind, pattern = rule
+        if kind == RULE_NAME:
+            return fnmatchcase(name, pattern)
+        if kind == RULE_IMAGE:
+            return fnmatchcase(image, pattern) or (
+                ":" not in pattern.rpartition("/")[2]
+                and fnmatchcase(image, f"{pattern}:*")
+            )
+        if kind == RULE_PROJECT:
+            return fnmatchcase(labels.get(COMPOSE_PROJECT_LABEL, ""), pattern)
+        key, has_value, value = pattern.partition("=")
+        return key in labels and (not has_value or labels[key] == value)
+
+    def list_filters(self) -> dict[str, list[str]]:
+        """Return engine filters listing at least the included containers.
+
+        The engine ands filters of different kinds, and ands labels, so only
+        include rules which are all names, or a single label or project, are
+        pushed down. Exclude rules are applied by `matches` only.
+        """
+        kinds = {kind for kind, _ in self._include}
+        if kinds == {RULE_NAME} and not any("[" in p for _, p in self._include):
+            return {"name": [_glob_to_regex(p) for _, p in self._include]}
+        if len(self._include) == 1:
+            return self._label_filters()
+        return {}
+
+    def event_filters(self) -> dict[str, list[str]]:
+        """Return engine filters streaming at least the events of included containers.
+
+        A container renamed to a name no longer included keeps its old name until
+        the next full resync.
+        """
+        kinds = {kind for kind, _ in self._include}
+        if kinds == {RULE_NAME} and not any(
+            _has_wildcards(pattern) for _, pattern in self._include
+        ):
+            # the container filter of the events matches names exactly
+            return {"container": [pattern for _, pattern in self._include]}
+        if len(self._include) == 1:
+            return self._label_filters()
+        return {}
+
+    def _label_filters(self) -> dict[str, list[str]]:
+        """Return the label filter of a single label or project include rule."""
+        kind, pattern = self._include[0]
+        if kind == RULE_LABEL:
+            return {"label": [pattern]}
+        if kind == RULE_PROJECT and not _has_wildcards(pattern):
+            return {"label": [f"{COMPOSE_PROJECT_LABEL}={pattern}"]}
+        return {}
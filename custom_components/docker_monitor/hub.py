@@ -0,0 +1,231 @@
+"""Docker hosts of a config entry."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Mapping
+from contextlib import suppress
+from datetime import datetime, timedelta
+import logging
+from typing import Any
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.storage import Store
+from homeassistant.util import slugify
+
+from .capabilities import EngineCapabilities
+from .const import (
+    CONF_DISK_USAGE_INTERVAL,
+    CONF_MIN_SAMPLE_INTERVAL,
+    CONF_STATS_MODE,
+    DEFAULT_DISK_USAGE_INTERVAL,
+    DEFAULT_MIN_SAMPLE_INTERVAL,
+    DEFAULT_STATS_MODE,
+    DOMAIN,
+    STATS_MODE_ONE_SHOT,
+)
+from .coordinator import DockerMonitorCoordinator, async_remove_device, host_name
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+# seconds between writes of the persisted state
+SAVE_DELAY = 60
+
+
+def storage_key(entry_id: str) -> str:
+    """Return the key of the persisted state of a config entry."""
+    return f"{DOMAIN}.{entry_id}"
+
+
+class DockerMonitorHub:
+    """Poll the docker hosts of a config entry concurrently, on a shared schedule.
+
+    Each host has its own coordinator, a refresh of a host is bounded by the update
+    interval, so a slow or unreachable host neither delays nor fails the others.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry_id: str,
+        urls: list[str],
+        update_interval: timedelta,
+        options: Mapping[str, Any],
+        capabilities: Mapping[str, Mapping[str, Any]] | None = None,
+    ) -> None:
+        """Init, capabilities are the ones probed by the config flow, per url."""
+        self._hass = hass
+        self._entry_id = entry_id
+        self._urls = urls
+        self._update_interval = update_interval
+        self._options = options
+        self._capabilities = {
+            url: EngineCapabilities.from_dict(data)
+            for url, data in (capabilities or {}).items()
+        }
+        self._session: aiohttp.ClientSession | None = None
+        self._unsub_refresh: Any = None
+        self._unsub_disk_usage: Any = None
+        self._disk_usage_interval = timedelta(
+            seconds=options.get(CONF_DISK_USAGE_INTERVAL, DEFAULT_DISK_USAGE_INTERVAL)
+        )
+        self._start_task: asyncio.Task | None = None
+        self._store: Store = Store(hass, STORAGE_VERSION, storage_key(entry_id))
+        self._save_scheduled = False
+        self.coordinators: list[DockerMonitorCoordinator] = []
+
+    async def async_setup(self) -> None:
+        """Restore the persisted hosts, then connect to them in the background.
+
+        Entities of the restored containers can be created right away, the other
+        ones are added as their host answers.
+        """
+        if any(urlsplit(url).scheme != "unix" for url in self._urls):
+            # TCP engines share a single connection pool
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=0)
+            )
+        self.coordinators = [
+            DockerMonitorCoordinator(
+                self._hass,
+                self._entry_id,
+                url,
+                None,
+                self._options,
+                timeout=self._update_interval.total_seconds(),
+                session=self._session,
+                # the first host keeps the entity ids of a single host entry
+                prefix=slugify(host_name(url)) if index else "",
+                capabilities=self._capabilities.get(url),
+            )
+            for index, url in enumerate(self._urls)
+        ]
+        stored = await self._store.async_load() or {}
+        for coordinator in self.coordinators:
+            if data := stored.get("hosts", {}).get(coordinator.url):
+                coordinator.restore(data)
+        self._start_task = self._hass.async_create_background_task(
+            self._async_start(), name=f"docker_monitor start {self._entry_id}"
+        )
+
+    async def _async_start(self) -> None:
+        """Connect to all hosts, fetch their first data and start polling.
+
+        Polling starts whatever the first refresh gives, a host failing is retried
+        on the next ones without holding the other hosts.
+        """
+        try:
+            results = await asyncio.gather(
+                *(c.init() for c in self.coordinators), return_exceptions=True
+            )
+            for coordinator, result in zip(self.coordinators, results):
+                if isinstance(result, Exception):
+                    _LOGGER.error(
+                        "Cannot connect to %s", coordinator.url, exc_info=result
+                    )
+            await self.async_refresh()
+            if all(c.last_update_success for c in self.coordinators):
+                self._remove_stale_devices()
+            elif not any(c.last_update_success for c in self.coordinators):
+                _LOGGER.warning("No docker host can be reached, retrying")
+        except Exception:  # pylint: disable=broad-except
+            _LOGGER.exception("Unexpected error on the first refresh, retrying")
+
+        self._unsub_refresh = async_track_time_interval(
+            self._hass, self._async_scheduled_refresh, self._tick()
+        )
+        if self._disk_usage_interval:
+            # a disk usage restored from the last run is reused if recent enough
+            self._async_request_disk_usage()
+            self._unsub_disk_usage = async_track_time_interval(
+                self._hass, self._async_request_disk_usage, self._disk_usage_interval
+            )
+
+    def _tick(self) -> timedelta:
+        """Return the interval between refreshes."""
+        if (
+            self._options.get(CONF_STATS_MODE, DEFAULT_STATS_MODE)
+            == STATS_MODE_ONE_SHOT
+        ):
+            # containers due for a sample are picked on each refresh
+            floor = self._options.get(
+                CONF_MIN_SAMPLE_INTERVAL, DEFAULT_MIN_SAMPLE_INTERVAL
+            )
+            return min(self._update_interval, timedelta(seconds=floor))
+        return self._update_interval
+
+    @callback
+    def _async_request_disk_usage(self, _now: datetime | None = None) -> None:
+        """Collect the disk usage of all hosts, in a lane apart from the refreshes."""
+        for coordinator in self.coordinators:
+            coordinator.async_request_disk_usage(self._disk_usage_interval / 2)
+
+    async def async_refresh(self) -> None:
+        """Refresh all hosts concurrently, skipping the ones still refreshing."""
+        await asyncio.gather(
+            *(
+                self._async_refresh_host(coordinator)
+                for coordinator in self.coordinators
+            )
+        )
+
+    async def _async_refresh_host(self, coordinator: DockerMonitorCoordinator) -> None:
+        if await coordinator.async_refresh_if_idle():
+            self._schedule_save()
+
+    async def async_stop(self) -> None:
+        """Stop polling and release connections."""
+        if self._start_task:
+            self._start_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._start_task
+            self._start_task = None
+        if self._unsub_refresh:
+            self._unsub_refresh()
+            self._unsub_refresh = None
+        if self._unsub_disk_usage:
+            self._unsub_disk_usage()
+            self._unsub_disk_usage = None
+        await asyncio.gather(*(c.async_stop() for c in self.coordinators))
+        if self._save_scheduled:
+            await self._store.async_save(self._data_to_save())
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    @callback
+    def _schedule_save(self) -> None:
+        """Persist the state at most every SAVE_DELAY seconds, and when stopping."""
+        if not self._save_scheduled:
+            self._save_scheduled = True
+            self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        self._save_scheduled = False
+        return {"hosts": {c.url: c.as_storage() for c in self.coordinators}}
+
+    def diagnostics(self) -> dict[str, Any]:
+        """Return the state and measures of all hosts."""
+        return {"hosts": [c.diagnostics() for c in self.coordinators]}
+
+    async def _async_scheduled_refresh(self, _now: datetime) -> None:
+        await self.async_refresh()
+
+    @callback
+    def _remove_stale_devices(self) -> None:
+        """Remove devices of containers destroyed while we were not running."""
+        known: set[str] = set()
+        for coordinator in self.coordinators:
+            known.add(coordinator.host_id)
+            known.update(coordinator.container_ids)
+        dev_reg = dr.async_get(self._hass)
+        for device in dr.async_entries_for_config_entry(dev_reg, self._entry_id):
+            for domain, identifier in device.identifiers:
+                if domain == DOMAIN and identifier not in known:
+                    async_remove_device(self._hass, identifier)
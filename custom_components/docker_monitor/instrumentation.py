@@ -0,0 +1,113 @@
+"""Self instrumentation of the coordinator."""
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+import math
+import time
+from typing import Any
+
+# upper bounds, in seconds, of the histogram buckets
+BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    math.inf,
+)
+
+
+class Histogram:
+    """Distribution of durations, in fixed buckets."""
+
+    __slots__ = ("counts", "count", "total", "min", "max", "last")
+
+    def __init__(self) -> None:
+        """Init."""
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self.last = 0.0
+
+    def observe(self, value: float) -> None:
+        """Record a duration."""
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self.last = value
+
+    def percentile(self, pct: float) -> float | None:
+        """Return the upper bound of the bucket holding the given percentile."""
+        if not self.count:
+            return None
+        rank = pct / 100 * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return a summary and the bucket counts."""
+        return {
+            "count": self.count,
+            "last": self.last,
+            "mean": self.total / self.count if self.count else None,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "buckets": {
+                f"le_{bound}": count for bound, count in zip(BUCKETS, self.counts)
+            },
+        }
+
+
+class Instrumentation:
+    """Phase timings and event counters of a coordinator."""
+
+    def __init__(self) -> None:
+        """Init."""
+        self.timings: dict[str, Histogram] = {}
+        self.counters: Counter[str] = Counter()
+
+    @contextmanager
+    def timer(self, phase: str) -> Iterator[None]:
+        """Time the enclosed block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(phase, time.perf_counter() - start)
+
+    def observe(self, phase: str, duration: float) -> None:
+        """Record the duration of a phase."""
+        if (histogram := self.timings.get(phase)) is None:
+            histogram = self.timings[phase] = Histogram()
+        histogram.observe(duration)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return all measures."""
+        return {
+            "timings": {
+                phase: histogram.as_dict() for phase, histogram in self.timings.items()
+            },
+            "counters": dict(self.counters),
+        }
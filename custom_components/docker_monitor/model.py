@@ -0,0 +1,369 @@
+"""Container snapshots, updated in place on each refresh."""
+from __future__ import annotations
+
+from collections.abc import Collection
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Any
+
+from .const import FAMILY_CPU, FAMILY_MEMORY, FAMILY_NETWORK
+from .families import STATS_FAMILIES
+from .windows import MetricWindows
+
+
+def parse_date(date_str: str) -> datetime:
+    """Parse a docker date, which has nanoseconds precision."""
+    to_parse = date_str[:-4] + date_str[-1:]
+    to_parse = to_parse.replace(".Z", ".0Z")
+    return datetime.strptime(to_parse, "%Y-%m-%dT%H:%M:%S.%fZ").replace(
+        tzinfo=timezone.utc
+    )
+
+
+@dataclass(slots=True)
+class CpuSample:
+    """CPU usage of a container."""
+
+    container: int = 0
+    system: int = 0
+    percentage: float = 0.0
+
+    def update(self, stat: dict[str, Any]) -> None:
+        """Update from a stats frame, computing usage since the previous one."""
+        cpu_stats = stat["cpu_stats"]
+        container = cpu_stats["cpu_usage"]["total_usage"]
+        system = cpu_stats["system_cpu_usage"]
+
+        if not self.system and stat.get("precpu_stats", {}).get("system_cpu_usage"):
+            # no previous sample, use the one the engine took a second before
+            self.container = stat["precpu_stats"]["cpu_usage"]["total_usage"]
+            self.system = stat["precpu_stats"]["system_cpu_usage"]
+
+        if self.system:
+            cpu_delta = float(container - self.container)
+            system_delta = float(system - self.system)
+
+            if cpu_delta > 0 and system_delta > 0:
+                self.percentage = (
+                    (cpu_delta / system_delta) * float(cpu_stats["online_cpus"]) * 100.0
+                )
+            elif system_delta != 0:
+                self.percentage = 0.0
+            # else same frame as the previous refresh, keep the percentage
+
+        self.container = container
+        self.system = system
+
+
+@dataclass(slots=True)
+class MemorySample:
+    """Memory usage of a container."""
+
+    usage: float = 0.0
+    max: float = 0.0
+    percentage: float = 0.0
+
+    def update(self, stat: dict[str, Any]) -> None:
+        """Update from a stats frame."""
+        memory_stats = stat["memory_stats"]
+        self.usage = float(memory_stats["usage"]) - float(
+            memory_stats["stats"]["inactive_file"]
+        )
+        self.max = float(memory_stats["limit"])
+        self.percentage = (self.usage / self.max) * 100
+
+
+@dataclass(slots=True)
+class InterfaceSample:
+    """Traffic of a network interface, or of all of them."""
+
+    tx_bytes: int = 0
+    rx_bytes: int = 0
+    speed_tx: float = 0.0
+    speed_rx: float = 0.0
+
+    def update(self, tx_bytes: int, rx_bytes: int, time: float | None) -> None:
+        """Update counters, computing speeds over time seconds if known."""
+        if time:
+            self.speed_tx = (tx_bytes - self.tx_bytes) / time
+            self.speed_rx = (rx_bytes - self.rx_bytes) / time
+        self.tx_bytes = tx_bytes
+        self.rx_bytes = rx_bytes
+
+
+@dataclass(slots=True)
+class NetworkSample:
+    """Network traffic of a container."""
+
+    last_update: datetime | None = None
+    total: InterfaceSample = field(default_factory=InterfaceSample)
+    interfaces: dict[str, InterfaceSample] = field(default_factory=dict)
+
+    def update(self, stat: dict[str, Any]) -> None:
+        """Update from a stats frame, computing speeds since the previous one."""
+        read = parse_date(stat["read"])
+        time = None
+        if self.last_update:
+            time = (read - self.last_update).total_seconds()
+            if time <= 0:
+                # same frame as the previous refresh
+                return
+        self.last_update = read
+
+        networks = stat.get("networks", {})
+        for if_name in self.interfaces.keys() - networks.keys():
+            del self.interfaces[if_name]
+
+        tx_total = rx_total = 0
+        for if_name, network_stat in networks.items():
+            intf = self.interfaces.get(if_name)
+            if intf is None:
+                intf = self.interfaces[if_name] = InterfaceSample()
+                intf.update(network_stat["tx_bytes"], network_stat["rx_bytes"], None)
+            else:
+                intf.update(network_stat["tx_bytes"], network_stat["rx_bytes"], time)
+            tx_total += network_stat["tx_bytes"]
+            rx_total += network_stat["rx_bytes"]
+        self.total.update(tx_total, rx_total, time)
+
+
+@dataclass(slots=True)
+class ContainerSnapshot:
+    """Last known state of a container."""
+
+    id: str
+    status: str = ""
+    started_at: datetime | None = None
+    cpu: CpuSample | None = None
+    mem: MemorySample | None = None
+    net: NetworkSample | None = None
+    # read time of the last stats frame
+    sampled_at: datetime | None = None
+    # False while the stats of the running container can't be sampled
+    available: bool = True
+    # status of the health check, None without health check
+    health: str | None = None
+    exit_code: int | None = None
+    # counted from the events of the container
+    oom_kills: int = 0
+    restarts: int = 0
+    # metric -> rolling-window aggregates, kept across restarts
+    windows: dict[str, MetricWindows] = field(default_factory=dict, repr=False)
+    _started_at_raw: str | None = field(default=None, repr=False, compare=False)
+
+    def update_state(self, attrs: dict[str, Any]) -> None:
+        """Update from the inspect data of the container."""
+        state = attrs["State"]
+        self.status = state["Status"]
+        self.health = (state.get("Health") or {}).get("Status")
+        self.exit_code = state.get("ExitCode")
+        if self.status != "running":
+            self.available = True
+            self.started_at = None
+            self._started_at_raw = None
+            self.cpu = self.mem = self.net = self.sampled_at = None
+        elif state["StartedAt"] != self._started_at_raw:
+            self._started_at_raw = state["StartedAt"]
+            self.started_at = parse_date(state["StartedAt"])
+            # restarted, counters start over
+            self.cpu = self.mem = self.net = self.sampled_at = None
+
+    def update_stats(
+        self, stat: dict[str, Any], families: Collection[str] = STATS_FAMILIES
+    ) -> None:
+        """Update the samples of the enabled metric families from a stats frame."""
+        if FAMILY_CPU in families:
+            if self.cpu is None:
+                self.cpu = CpuSample()
+            self.cpu.update(stat)
+        if FAMILY_MEMORY in families:
+            if self.mem is None:
+                self.mem = MemorySample()
+            self.mem.update(stat)
+        if FAMILY_NETWORK in families:
+            if self.net is None:
+                self.net = NetworkSample()
+            self.net.update(stat)
+            self.sampled_at = self.net.last_update
+        else:
+            self.sampled_at = parse_date(stat["read"])
+        self.available = True
+
+    def as_storage(self) -> dict[str, Any]:
+        """Return the counters the next rates are computed from, to persist them."""
+        data: dict[str, Any] = {
+            "id": self.id,
+            "started_at": self._started_at_raw,
+            "oom_kills": self.oom_kills,
+            "restarts": self.restarts,
+        }
+        if self.cpu is not None:
+            data["cpu"] = [self.cpu.container, self.cpu.system]
+        if self.net is not None and self.net.last_update is not None:
+            data["net"] = {
+                "read": self.net.last_update.isoformat(),
+                "interfaces": {
+                    if_name: [intf.tx_bytes, intf.rx_bytes]
+                    for if_name, intf in self.net.interfaces.items()
+                },
+            }
+        return data
+
+    @classmethod
+    def from_storage(cls, data: dict[str, Any]) -> ContainerSnapshot:
+        """Restore the counters of a snapshot, for the same run of the container."""
+        snapshot = cls(
+            data["id"],
+            oom_kills=data.get("oom_kills", 0),
+            restarts=data.get("restarts", 0),
+            _started_at_raw=data["started_at"],
+        )
+        if data["started_at"] is not None:
+            snapshot.started_at = parse_date(data["started_at"])
+        if cpu := data.get("cpu"):
+            snapshot.cpu = CpuSample(container=cpu[0], system=cpu[1])
+        if net := data.get("net"):
+            snapshot.net = NetworkSample(datetime.fromisoformat(net["read"]))
+            for if_name, (tx_bytes, rx_bytes) in net["interfaces"].items():
+                snapshot.net.interfaces[if_name] = InterfaceSample(tx_bytes, rx_bytes)
+                snapshot.net.total.tx_bytes += tx_bytes
+                snapshot.net.total.rx_bytes += rx_bytes
+        return snapshot
+
+    def usage(self) -> tuple[float, float, float] | None:
+        """Return the cpu percentage, memory usage and network speed, if sampled.
+
+        Metrics of disabled families are 0.
+        """
+        if self.sampled_at is None:
+            return None
+        return (
+            self.cpu.percentage if self.cpu else 0.0,
+            self.mem.usage if self.mem else 0.0,
+            self.net.total.speed_tx + self.net.total.speed_rx if self.net else 0.0,
+        )
+
+    def record_windows(self, minutes: list[int], now: float) -> None:
+        """Add the last sample to the rolling windows of its metrics."""
+        values: list[tuple[str, float]] = []
+        if self.cpu is not None:
+            values.append(("cpu.percentage", self.cpu.percentage))
+        if self.mem is not None:
+            values.append(("mem.usage", self.mem.usage))
+        if self.net is not None:
+            values.append(("net.speed_tx", self.net.total.speed_tx))
+            values.append(("net.speed_rx", self.net.total.speed_rx))
+        for metric, value in values:
+            if (windows := self.windows.get(metric)) is None:
+                windows = self.windows[metric] = MetricWindows(minutes)
+            windows.add(now, value)
+
+    def expire_windows(self, now: float) -> None:
+        """Drop the values older than their window."""
+        for windows in self.windows.values():
+            windows.expire(now)
+
+
+@dataclass(slots=True)
+class HostTotals:
+    """Totals of the containers of a host, summed while the refresh computes them."""
+
+    cpu_percentage: float = 0.0
+    mem_usage: float = 0.0
+    speed_tx: float = 0.0
+    speed_rx: float = 0.0
+    running: int = 0
+    stopped: int = 0
+    unhealthy: int = 0
+
+    def add(self, snapshot: ContainerSnapshot) -> None:
+        """Add a container from its last snapshot."""
+        if snapshot.status != "running":
+            self.stopped += 1
+            return
+        self.running += 1
+        if snapshot.health == "unhealthy":
+            self.unhealthy += 1
+        if snapshot.cpu:
+            self.cpu_percentage += snapshot.cpu.percentage
+        if snapshot.mem:
+            self.mem_usage += snapshot.mem.usage
+        if snapshot.net:
+            self.speed_tx += snapshot.net.total.speed_tx
+            self.speed_rx += snapshot.net.total.speed_rx
+
+
+@dataclass(slots=True)
+class DiskUsageItem:
+    """Disk used by one kind of engine objects, like `docker system df` shows it."""
+
+    size: int = 0
+    reclaimable: int = 0
+    count: int = 0
+    active: int = 0
+
+    def add(self, size: int, active: bool) -> None:
+        """Add an object of this kind, active ones are used by a container."""
+        size = max(size, 0)  # -1 when the engine didn't compute it
+        self.size += size
+        self.count += 1
+        if active:
+            self.active += 1
+        else:
+            self.reclaimable += size
+
+
+@dataclass(slots=True)
+class DiskUsage:
+    """Disk used by the images, containers, volumes and build cache of an engine."""
+
+    updated: datetime
+    images: DiskUsageItem = field(default_factory=DiskUsageItem)
+    containers: DiskUsageItem = field(default_factory=DiskUsageItem)
+    volumes: DiskUsageItem = field(default_factory=DiskUsageItem)
+    build_cache: DiskUsageItem = field(default_factory=DiskUsageItem)
+
+    @classmethod
+    def from_df(cls, data: dict[str, Any], updated: datetime) -> DiskUsage:
+        """Sum the objects listed by `/system/df`."""
+        usage = cls(updated)
+        for image in data.get("Images") or ():
+            # layers shared with other images are only freed with all of them
+            unique = image["Size"] - max(image.get("SharedSize", 0), 0)
+            usage.images.add(unique, image.get("Containers", 0) > 0)
+        # the total counts shared layers once
+        usage.images.size = data.get("LayersSize", usage.images.size)
+        for container in data.get("Containers") or ():
+            usage.containers.add(
+                container.get("SizeRw", 0), container.get("State") == "running"
+            )
+        for volume in data.get("Volumes") or ():
+            usage_data = volume.get("UsageData") or {}
+            usage.volumes.add(
+                usage_data.get("Size", -1), usage_data.get("RefCount", 0) > 0
+            )
+        for cache in data.get("BuildCache") or ():
+            if not cache.get("Shared"):
+                usage.build_cache.add(cache.get("Size", 0), cache.get("InUse", False))
+        return usage
+
+    def as_storage(self) -> dict[str, Any]:
+        """Return the disk usage to persist across restarts."""
+        return {
+            "updated": self.updated.isoformat(),
+            "images": asdict(self.images),
+            "containers": asdict(self.containers),
+            "volumes": asdict(self.volumes),
+            "build_cache": asdict(self.build_cache),
+        }
+
+    @classmethod
+    def from_storage(cls, data: dict[str, Any]) -> DiskUsage:
+        """Restore a disk usage persisted with as_storage."""
+        return cls(
+            datetime.fromisoformat(data["updated"]),
+            DiskUsageItem(**data["images"]),
+            DiskUsageItem(**data["containers"]),
+            DiskUsageItem(**data["volumes"]),
+            DiskUsageItem(**data["build_cache"]),
+        )
@@ -0,0 +1,116 @@
+"""Known containers registry."""
+from __future__ import annotations
+
+from collections.abc import Collection, Iterator
+from typing import Any
+
+COMPOSE_PROJECT_LABEL = "com.docker.compose.project"
+
+
+def container_name(attrs: dict[str, Any]) -> str:
+    """Return the name of a container from its inspect data."""
+    return attrs["Name"].lstrip("/")
+
+
+def persisted(attrs: dict[str, Any]) -> dict[str, Any]:
+    """Return the part of the inspect data of a container worth persisting."""
+    state = attrs["State"]
+    persisted_state = {
+        "Status": state["Status"],
+        "StartedAt": state["StartedAt"],
+        "Pid": state.get("Pid", 0),
+        "ExitCode": state.get("ExitCode"),
+    }
+    if health := state.get("Health"):
+        persisted_state["Health"] = {"Status": health.get("Status")}
+    return {
+        "Id": attrs["Id"],
+        "Name": attrs["Name"],
+        "RestartCount": attrs.get("RestartCount", 0),
+        "State": persisted_state,
+        "Config": {
+            "Image": attrs["Config"].get("Image", ""),
+            "Labels": attrs["Config"].get("Labels") or {},
+        },
+    }
+
+
+def container_matches(
+    attrs: dict[str, Any],
+    names: Collection[str] = (),
+    labels: Collection[str] = (),
+    projects: Collection[str] = (),
+) -> bool:
+    """Return whether a container matches filters, like `docker ps --filter`.
+
+    It must have one of the names, be part of one of the compose projects and
+    have all the labels, given as `key` or `key=value`. Empty filters match all.
+    """
+    container_labels = attrs["Config"].get("Labels") or {}
+    if names and container_name(attrs) not in names:
+        return False
+    if projects and container_labels.get(COMPOSE_PROJECT_LABEL) not in projects:
+        return False
+    for label in labels:
+        key, has_value, value = label.partition("=")
+        if key not in container_labels or (
+            has_value and container_labels[key] != value
+        ):
+            return False
+    return True
+
+
+class ContainerRegistry:
+    """Inspect data of the known containers, indexed by id and by name."""
+
+    def __init__(self) -> None:
+        """Init."""
+        self._by_id: dict[str, dict[str, Any]] = {}
+        self._id_by_name: dict[str, str] = {}
+
+    def __len__(self) -> int:
+        """Return the number of known containers."""
+        return len(self._by_id)
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over container names."""
+        return iter(self._id_by_name)
+
+    def items(self) -> Iterator[tuple[str, dict[str, Any]]]:
+        """Iterate over (name, inspect data) pairs."""
+        for name, container_id in self._id_by_name.items():
+            yield name, self._by_id[container_id]
+
+    def get(self, container_id: str) -> dict[str, Any] | None:
+        """Return a container by id."""
+        return self._by_id.get(container_id)
+
+    def get_by_name(self, name: str) -> dict[str, Any] | None:
+        """Return a container by name."""
+        container_id = self._id_by_name.get(name)
+        return self._by_id[container_id] if container_id else None
+
+    def replace(self, containers: list[dict[str, Any]]) -> None:
+        """Replace all known containers."""
+        self._by_id = {container["Id"]: container for container in containers}
+        self._id_by_name = {
+            container_name(container): container["Id"] for container in containers
+        }
+
+    def upsert(self, attrs: dict[str, Any]) -> dict[str, Any] | None:
+        """Add or update a container, returning the previous inspect data if any."""
+        container_id = attrs["Id"]
+        previous = self._by_id.get(container_id)
+        if previous is not None:
+            # the container may have been renamed
+            self._id_by_name.pop(container_name(previous), None)
+        self._by_id[container_id] = attrs
+        self._id_by_name[container_name(attrs)] = container_id
+        return previous
+
+    def remove(self, container_id: str) -> dict[str, Any] | None:
+        """Remove a container, returning its inspect data if it was known."""
+        attrs = self._by_id.pop(container_id, None)
+        if attrs is not None:
+            self._id_by_name.pop(container_name(attrs), None)
+        return attrs
@@ -0,0 +1,101 @@
+"""Background stats sampling."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+import logging
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+
+from .breaker import CircuitBreaker
+from .engine import DockerEngineClient, DockerEngineError
+from .instrumentation import Instrumentation
+
+_LOGGER = logging.getLogger(__name__)
+
+# seconds to wait before reopening a stream that ended or failed, doubling up to
+# the max until a frame is received
+RETRY_MIN = 5
+RETRY_MAX = 300
+
+
+class StatsSampler:
+    """Consume the stats stream of a container, keeping only the latest frame.
+
+    Readers get the latest frame from `take` without any I/O. While the circuit
+    breaker of the engine is open, the stream is not reopened.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        client: DockerEngineClient,
+        container_id: str,
+        instrumentation: Instrumentation,
+        breaker: CircuitBreaker,
+        on_frame: Callable[[dict[str, Any]], None] | None = None,
+    ) -> None:
+        """Init, on_frame is called with each frame as it is received."""
+        self._hass = hass
+        self._client = client
+        self._container_id = container_id
+        self._instrumentation = instrumentation
+        self._breaker = breaker
+        self._on_frame = on_frame
+        self._task: asyncio.Task | None = None
+        self._unread = 0
+        self.latest: dict[str, Any] | None = None
+        # the stream failed and no frame was received since
+        self.failing = False
+
+    def take(self) -> dict[str, Any] | None:
+        """Return the latest frame, counting the ones replaced before being read."""
+        if self._unread > 1:
+            self._instrumentation.counters["dropped_frames"] += self._unread - 1
+        self._unread = 0
+        return self.latest
+
+    def start(self, delay: float = 0) -> None:
+        """Start consuming the stream in the background, after delay seconds."""
+        if self._task is None:
+            self._task = self._hass.async_create_background_task(
+                self._run(delay), name=f"docker_monitor stats {self._container_id}"
+            )
+
+    async def stop(self) -> None:
+        """Stop consuming the stream and close it."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self, start_delay: float) -> None:
+        if start_delay:
+            await asyncio.sleep(start_delay)
+        delay = RETRY_MIN
+        while True:
+            if self._breaker.is_open:
+                await asyncio.sleep(RETRY_MIN)
+                continue
+            try:
+                async for frame in self._client.stats_stream(self._container_id):
+                    self.latest = frame
+                    self._unread += 1
+                    self.failing = False
+                    delay = RETRY_MIN
+                    self._breaker.success()
+                    if self._on_frame:
+                        self._on_frame(frame)
+                _LOGGER.debug("Stats stream of %s ended", self._container_id)
+            except DockerEngineError as err:
+                _LOGGER.debug("Stats stream of %s failed: %s", self._container_id, err)
+                self.failing = True
+                if err.unreachable and self._breaker.failure():
+                    self._instrumentation.counters["breaker_opened"] += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RETRY_MAX)
+            self._instrumentation.counters["stream_reconnects"] += 1
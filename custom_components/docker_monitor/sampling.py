@@ -0,0 +1,99 @@
+"""Adaptive scheduling of the stats requests of containers."""
+from __future__ import annotations
+
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+# a sample is volatile when it moved more than one of these since the previous one
+VOLATILE_CPU = 5.0  # percentage points
+VOLATILE_MEMORY = 0.05  # ratio of the previous usage
+VOLATILE_MEMORY_MIN = 1024 * 1024  # bytes, smaller changes are noise
+VOLATILE_NETWORK = 0.5  # ratio of the previous speed
+VOLATILE_NETWORK_MIN = 10 * 1024  # bytes/s, smaller speeds are noise
+
+
+def is_volatile(
+    previous: tuple[float, float, float] | None,
+    current: tuple[float, float, float] | None,
+) -> bool:
+    """Return whether the (cpu %, memory, network speed) usage moved significantly."""
+    if previous is None or current is None:
+        return False
+    cpu, mem, net = current
+    prev_cpu, prev_mem, prev_net = previous
+    return (
+        abs(cpu - prev_cpu) >= VOLATILE_CPU
+        or abs(mem - prev_mem) >= max(VOLATILE_MEMORY * prev_mem, VOLATILE_MEMORY_MIN)
+        or (
+            max(net, prev_net) >= VOLATILE_NETWORK_MIN
+            and abs(net - prev_net) >= VOLATILE_NETWORK * prev_net
+        )
+    )
+
+
+@dataclass(slots=True)
+class SamplingSlot:
+    """Sampling interval and next due time of a container."""
+
+    interval: float
+    due: float = 0.0
+    # consecutive failed samples
+    failures: int = 0
+
+
+class SamplingScheduler:
+    """Decide which containers to sample on each refresh.
+
+    A new container is sampled every floor seconds. Each time its usage moves, it
+    is sampled twice as often, down to floor seconds, each time it doesn't, half as
+    often, up to ceiling seconds. A failed sample is retried after floor seconds,
+    doubling on each failure up to ceiling seconds. At most max_requests
+    containers are sampled on one refresh, the most overdue first.
+    """
+
+    def __init__(self, floor: float, ceiling: float, max_requests: int) -> None:
+        """Init."""
+        self._floor = floor
+        self._ceiling = max(ceiling, floor)
+        self._max_requests = max_requests
+        self._slots: dict[str, SamplingSlot] = {}
+
+    def due(self, container_ids: Iterable[str], now: float) -> list[str]:
+        """Return the containers to sample now, forgetting the other ones."""
+        slots: dict[str, SamplingSlot] = {}
+        for container_id in container_ids:
+            slot = self._slots.get(container_id)
+            slots[container_id] = slot or SamplingSlot(self._floor, now)
+        self._slots = slots
+
+        due = sorted(
+            (slot.due, container_id)
+            for container_id, slot in slots.items()
+            if slot.due <= now
+        )
+        if self._max_requests:
+            due = due[: self._max_requests]
+        return [container_id for _, container_id in due]
+
+    def sampled(self, container_id: str, volatile: bool, now: float) -> None:
+        """Adapt the interval of a container after sampling it."""
+        if (slot := self._slots.get(container_id)) is None:
+            return
+        if volatile:
+            slot.interval = max(self._floor, slot.interval / 2)
+        else:
+            slot.interval = min(self._ceiling, slot.interval * 2)
+        slot.failures = 0
+        slot.due = now + slot.interval
+
+    def failed(self, container_id: str, now: float) -> None:
+        """Postpone the next sample of a container after a failed one."""
+        if (slot := self._slots.get(container_id)) is None:
+            return
+        slot.due = now + min(self._ceiling, self._floor * 2**slot.failures)
+        slot.failures += 1
+
+    def interval(self, container_id: str) -> float | None:
+        """Return the current sampling interval of a container."""
+        slot = self._slots.get(container_id)
+        return slot.interval if slot else None
@@ -1,5 +1,6 @@
 """Docker monitor sensor."""
 from datetime import date, datetime
+from typing import Any
 
 from _decimal import Decimal
 
@@ -9,28 +10,108 @@ from homeassistant.components.sensor import (
     SensorStateClass,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import PERCENTAGE, UnitOfDataRate, UnitOfInformation
-from homeassistant.core import HomeAssistant
+from homeassistant.const import (
+    PERCENTAGE,
+    EntityCategory,
+    UnitOfDataRate,
+    UnitOfInformation,
+    UnitOfTime,
+)
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.typing import StateType
 from homeassistant.util import dt as dt_util
 
-from . import COORDINATOR, DOMAIN as DOCKER_MONITOR, DockerMonitorCoordinator
-from .entities import DockerMonitorEntity
+from . import DOMAIN as DOCKER_MONITOR, HUB, DockerMonitorCoordinator, DockerMonitorHub
+from .const import (
+    CONF_DIAGNOSTIC_SENSORS,
+    CONF_DISK_USAGE_INTERVAL,
+    DEFAULT_DIAGNOSTIC_SENSORS,
+    DEFAULT_DISK_USAGE_INTERVAL,
+    FAMILY_CPU,
+    FAMILY_HEALTH,
+    FAMILY_MEMORY,
+    FAMILY_NETWORK,
+    FAMILY_UPTIME,
+    SIGNAL_DISK_USAGE_UPDATED,
+)
+from .entities import (
+    DockerHostEntity,
+    DockerMonitorEntity,
+    async_setup_container_entities,
+)
+
+# phases of the coordinator exposed as diagnostic sensors
+DIAGNOSTIC_TIMINGS = (
+    "init.list",
+    "refresh",
+    "refresh.stats",
+    "refresh.stats_per_container",
+    "refresh.compute",
+    "fan_out",
+    "disk_usage",
+)
+DIAGNOSTIC_COUNTERS = (
+    "full_resyncs",
+    "event_updates",
+    "stream_reconnects",
+    "dropped_frames",
+    "failed_stats",
+    "client_rebuilds",
+    "events_failures",
+    "events_reconnects",
+    "breaker_opened",
+    "failed_disk_usage",
+)
+# totals of the containers of a host: attribute of HostTotals -> entity name, unit
+HOST_TOTALS = {
+    "cpu_percentage": ("total_cpu_percentage", PERCENTAGE),
+    "mem_usage": ("total_memory_usage", UnitOfInformation.BYTES),
+    "speed_tx": ("total_speed_tx", UnitOfDataRate.BYTES_PER_SECOND),
+    "speed_rx": ("total_speed_rx", UnitOfDataRate.BYTES_PER_SECOND),
+    "running": ("running_containers", None),
+    "stopped": ("stopped_containers", None),
+    "unhealthy": ("unhealthy_containers", None),
+}
+# kinds of engine objects of the disk usage
+DISK_USAGE_KINDS = ("images", "containers", "volumes", "build_cache")
 
 
 async def async_setup_entry(
     hass: HomeAssistant, entry: ConfigEntry, async_add_entities: AddEntitiesCallback
 ) -> None:
     """Set up the docker monitor sensor."""
-    sensors: list[DockerMonitorEntity] = []
+    hub: DockerMonitorHub = hass.data[DOCKER_MONITOR][entry.entry_id][HUB]
+    async_setup_container_entities(
+        hass, entry, hub, async_add_entities, _create_sensors
+    )
+    async_add_entities(
+        DockerHostTotalSensor(coordinator, total)
+        for coordinator in hub.coordinators
+        for total in HOST_TOTALS
+    )
+    if entry.options.get(CONF_DISK_USAGE_INTERVAL, DEFAULT_DISK_USAGE_INTERVAL):
+        async_add_entities(
+            DockerHostDiskUsageSensor(coordinator, kind)
+            for coordinator in hub.coordinators
+            for kind in DISK_USAGE_KINDS
+        )
+
+    if entry.options.get(CONF_DIAGNOSTIC_SENSORS, DEFAULT_DIAGNOSTIC_SENSORS):
+        for coordinator in hub.coordinators:
+            async_add_entities(
+                [DockerHostTimingSensor(coordinator, p) for p in DIAGNOSTIC_TIMINGS]
+                + [DockerHostCounterSensor(coordinator, c) for c in DIAGNOSTIC_COUNTERS]
+            )
 
-    coordinator: DockerMonitorCoordinator = hass.data[DOCKER_MONITOR][entry.entry_id][
-        COORDINATOR
-    ]
 
-    for container_name, _data in coordinator.data.items():
-        # if data.get("net"):
+def _create_sensors(
+    coordinator: DockerMonitorCoordinator, container_name: str
+) -> list[DockerMonitorEntity]:
+    families = coordinator.families(container_name)
+    sensors: list[DockerMonitorEntity] = []
+    if FAMILY_NETWORK in families:
         sensors.extend(
             (
                 DockerMonitorNetworkSpeedSensor(
@@ -42,7 +123,7 @@ async def async_setup_entry(
             )
         )
 
-        # if data.get("mem"):
+    if FAMILY_MEMORY in families:
         sensors.extend(
             (
                 DockerMonitorMemSensor(coordinator, container_name, "percentage"),
@@ -51,17 +132,22 @@ async def async_setup_entry(
             )
         )
 
-        # if data.get("cpu"):
-        sensors.extend(
-            (DockerMonitorCPUSensor(coordinator, container_name, "percentage"),)
+    if FAMILY_CPU in families:
+        sensors.append(
+            DockerMonitorCPUSensor(coordinator, container_name, "percentage")
         )
 
-        # if data.get("started_at"):
-        sensors.extend(
-            (DockerMonitorUptimeSensor(coordinator, container_name, "started_at"),)
+    if FAMILY_UPTIME in families:
+        sensors.append(
+            DockerMonitorUptimeSensor(coordinator, container_name, "started_at")
         )
 
-    async_add_entities(sensors)
+    if FAMILY_HEALTH in families:
+        sensors.extend(
+            DockerMonitorEventSensor(coordinator, container_name, key)
+            for key in ("exit_code", "oom_kills", "restarts")
+        )
+    return sensors
 
 
 class DockerMonitorUptimeSensor(DockerMonitorEntity, SensorEntity):
@@ -71,7 +157,7 @@ class DockerMonitorUptimeSensor(DockerMonitorEntity, SensorEntity):
         self, coordinator: DockerMonitorCoordinator, container_name, key
     ) -> None:
         """Init."""
-        super().__init__(coordinator, container_name, key)
+        super().__init__(coordinator, container_name, key, key)
         self._key = key
 
     @property
@@ -82,10 +168,39 @@ class DockerMonitorUptimeSensor(DockerMonitorEntity, SensorEntity):
     @property
     def native_value(self) -> StateType | date | datetime | Decimal:
         """Native value."""
-        last_started = self.coordinator.data.get(self._container_name, {}).get(
-            self._key
-        )
-        return dt_util.as_local(last_started) if last_started else None
+        snapshot = self._snapshot
+        if snapshot and snapshot.started_at:
+            return dt_util.as_local(snapshot.started_at)
+        return None
+
+
+class DockerMonitorEventSensor(DockerMonitorEntity, SensorEntity):
+    """Exit code or counter of a container, maintained from its events."""
+
+    def __init__(
+        self, coordinator: DockerMonitorCoordinator, container_name, key
+    ) -> None:
+        """Init."""
+        super().__init__(coordinator, container_name, key, key)
+        self._key = key
+
+    @property
+    def state_class(self) -> SensorStateClass | str | None:
+        """State class."""
+        if self._key == "exit_code":
+            return None
+        return SensorStateClass.TOTAL_INCREASING
+
+    @property
+    def native_value(self) -> StateType | date | datetime | Decimal:
+        """Native value."""
+        snapshot = self._snapshot
+        return getattr(snapshot, self._key) if snapshot else None
+
+    @property
+    def icon(self) -> str | None:
+        """Return the icon to use in the frontend, if any."""
+        return "mdi:restart" if self._key == "restarts" else "mdi:alert-octagon"
 
 
 class DockerMonitorCPUSensor(DockerMonitorEntity, SensorEntity):
@@ -95,7 +210,7 @@ class DockerMonitorCPUSensor(DockerMonitorEntity, SensorEntity):
         self, coordinator: DockerMonitorCoordinator, container_name, key
     ) -> None:
         """Init."""
-        super().__init__(coordinator, container_name, "cpu_" + key)
+        super().__init__(coordinator, container_name, "cpu_" + key, "cpu." + key)
         self._key = key
 
     @property
@@ -111,11 +226,8 @@ class DockerMonitorCPUSensor(DockerMonitorEntity, SensorEntity):
     @property
     def native_value(self) -> StateType | date | datetime | Decimal:
         """Native value."""
-        return (
-            self.coordinator.data.get(self._container_name, {})
-            .get("cpu", {})
-            .get(self._key, 0)
-        )
+        snapshot = self._snapshot
+        return snapshot.cpu.percentage if snapshot and snapshot.cpu else 0
 
     @property
     def suggested_display_precision(self) -> int | None:
@@ -140,7 +252,7 @@ class DockerMonitorMemSensor(DockerMonitorEntity, SensorEntity):
         self, coordinator: DockerMonitorCoordinator, container_name, key
     ) -> None:
         """Init."""
-        super().__init__(coordinator, container_name, "memory_" + key)
+        super().__init__(coordinator, container_name, "memory_" + key, "mem." + key)
         self._key = key
 
     @property
@@ -156,11 +268,8 @@ class DockerMonitorMemSensor(DockerMonitorEntity, SensorEntity):
     @property
     def native_value(self) -> StateType | date | datetime | Decimal:
         """Native value."""
-        return (
-            self.coordinator.data.get(self._container_name, {})
-            .get("mem", {})
-            .get(self._key, 0)
-        )
+        snapshot = self._snapshot
+        return getattr(snapshot.mem, self._key) if snapshot and snapshot.mem else 0
 
     @property
     def native_unit_of_measurement(self) -> str | None:
@@ -185,7 +294,7 @@ class DockerMonitorNetworkSpeedSensor(DockerMonitorEntity, SensorEntity):
         self, coordinator: DockerMonitorCoordinator, container_name, key
     ) -> None:
         """Init."""
-        super().__init__(coordinator, container_name, "total_" + key)
+        super().__init__(coordinator, container_name, "total_" + key, "net." + key)
         self._key = key
 
     @property
@@ -201,12 +310,10 @@ class DockerMonitorNetworkSpeedSensor(DockerMonitorEntity, SensorEntity):
     @property
     def native_value(self) -> StateType | date | datetime | Decimal:
         """Native value."""
-        return (
-            self.coordinator.data.get(self._container_name, {})
-            .get("net", {})
-            .get("total", {})
-            .get(self._key, 0)
-        )
+        snapshot = self._snapshot
+        if snapshot and snapshot.net:
+            return getattr(snapshot.net.total, self._key)
+        return 0
 
     @property
     def native_unit_of_measurement(self) -> str | None:
@@ -217,3 +324,181 @@ class DockerMonitorNetworkSpeedSensor(DockerMonitorEntity, SensorEntity):
     def suggested_display_precision(self) -> int | None:
         """Return the suggested number of decimal digits for display."""
         return 2
+
+
+class DockerHostTimingSensor(DockerHostEntity, SensorEntity):
+    """Duration of a phase of the coordinator, with its histogram as attributes."""
+
+    def __init__(self, coordinator: DockerMonitorCoordinator, phase: str) -> None:
+        """Init."""
+        super().__init__(coordinator, f"{phase}_duration")
+        self._phase = phase
+
+    @property
+    def device_class(self) -> SensorDeviceClass | None:
+        """Device class."""
+        return SensorDeviceClass.DURATION
+
+    @property
+    def state_class(self) -> SensorStateClass | str | None:
+        """State class."""
+        return SensorStateClass.MEASUREMENT
+
+    @property
+    def native_value(self) -> StateType | date | datetime | Decimal:
+        """Return the 95th percentile of the duration."""
+        histogram = self.coordinator.instrumentation.timings.get(self._phase)
+        return histogram.percentile(95) if histogram else None
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        """Return the histogram of the duration."""
+        histogram = self.coordinator.instrumentation.timings.get(self._phase)
+        return histogram.as_dict() if histogram else None
+
+    @property
+    def native_unit_of_measurement(self) -> str | None:
+        """Unit."""
+        return UnitOfTime.SECONDS
+
+    @property
+    def suggested_display_precision(self) -> int | None:
+        """Return the suggested number of decimal digits for display."""
+        return 3
+
+
+class DockerHostCounterSensor(DockerHostEntity, SensorEntity):
+    """Count of an event of the coordinator."""
+
+    def __init__(self, coordinator: DockerMonitorCoordinator, counter: str) -> None:
+        """Init."""
+        super().__init__(coordinator, counter)
+        self._counter = counter
+
+    @property
+    def state_class(self) -> SensorStateClass | str | None:
+        """State class."""
+        return SensorStateClass.TOTAL_INCREASING
+
+    @property
+    def native_value(self) -> StateType | date | datetime | Decimal:
+        """Native value."""
+        return self.coordinator.instrumentation.counters[self._counter]
+
+
+class DockerHostTotalSensor(DockerHostEntity, SensorEntity):
+    """Total of the containers of a host, computed by each refresh."""
+
+    def __init__(self, coordinator: DockerMonitorCoordinator, total: str) -> None:
+        """Init."""
+        name, unit = HOST_TOTALS[total]
+        super().__init__(coordinator, name)
+        self._total = total
+        self._attr_native_unit_of_measurement = unit
+
+    @property
+    def entity_category(self) -> EntityCategory | None:
+        """Return the category of the entity, if any."""
+        return None
+
+    @property
+    def device_class(self) -> SensorDeviceClass | None:
+        """Device class."""
+        if self._attr_native_unit_of_measurement == UnitOfInformation.BYTES:
+            return SensorDeviceClass.DATA_SIZE
+        if self._attr_native_unit_of_measurement == UnitOfDataRate.BYTES_PER_SECOND:
+            return SensorDeviceClass.DATA_RATE
+        return None
+
+    @property
+    def state_class(self) -> SensorStateClass | str | None:
+        """State class."""
+        return SensorStateClass.MEASUREMENT
+
+    @property
+    def native_value(self) -> StateType | date | datetime | Decimal:
+        """Native value."""
+        return getattr(self.coordinator.totals, self._total)
+
+    @property
+    def suggested_display_precision(self) -> int | None:
+        """Return the suggested number of decimal digits for display."""
+        return 2 if self._attr_native_unit_of_measurement else None
+
+
+class DockerHostDiskUsageSensor(DockerHostEntity, SensorEntity):
+    """Disk used by a kind of engine objects, updated by the disk usage lane."""
+
+    def __init__(self, coordinator: DockerMonitorCoordinator, kind: str) -> None:
+        """Init."""
+        super().__init__(coordinator, f"{kind}_disk_usage")
+        self._kind = kind
+
+    async def async_added_to_hass(self) -> None:
+        """Write the state when a disk usage collection is done."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_DISK_USAGE_UPDATED.format(self.coordinator.host_id),
+                self._handle_disk_usage_update,
+            )
+        )
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Ignore refreshes, they don't change the disk usage."""
+
+    @callback
+    def _handle_disk_usage_update(self) -> None:
+        self.async_write_ha_state()
+
+    @property
+    def available(self) -> bool:
+        """Return whether the disk usage was collected once, even if stale."""
+        return self.coordinator.disk_usage is not None
+
+    @property
+    def entity_category(self) -> EntityCategory | None:
+        """Return the category of the entity, if any."""
+        return None
+
+    @property
+    def device_class(self) -> SensorDeviceClass | None:
+        """Device class."""
+        return SensorDeviceClass.DATA_SIZE
+
+    @property
+    def state_class(self) -> SensorStateClass | str | None:
+        """State class."""
+        return SensorStateClass.MEASUREMENT
+
+    @property
+    def native_value(self) -> StateType | date | datetime | Decimal:
+        """Native value."""
+        if disk_usage := self.coordinator.disk_usage:
+            return getattr(disk_usage, self._kind).size
+        return None
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        """Return the reclaimable size, the counts and the collection time."""
+        if (disk_usage := self.coordinator.disk_usage) is None:
+            return None
+        item = getattr(disk_usage, self._kind)
+        return {
+            "reclaimable": item.reclaimable,
+            "count": item.count,
+            "active": item.active,
+            "updated": disk_usage.updated.isoformat(),
+        }
+
+    @property
+    def native_unit_of_measurement(self) -> str | None:
+        """Unit."""
+        return UnitOfInformation.BYTES
+
+    @property
+    def icon(self) -> str | None:
+        """Return the icon to use in the frontend, if any."""
+        return "mdi:harddisk"
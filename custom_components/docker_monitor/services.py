@@ -0,0 +1,124 @@
+"""Services of the docker monitor integration."""
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.core import HomeAssistant, ServiceCall, callback
+from homeassistant.exceptions import HomeAssistantError
+import homeassistant.helpers.config_validation as cv
+
+from .const import (
+    ATTR_ACTION,
+    ATTR_COMPOSE_PROJECTS,
+    ATTR_LABELS,
+    ATTR_NAMES,
+    ATTR_PARALLELISM,
+    ATTR_SIGNAL,
+    ATTR_TIMEOUT,
+    CONTAINER_ACTIONS,
+    DEFAULT_PARALLELISM,
+    DOMAIN,
+    EVENT_BULK_ACTION,
+    HUB,
+    MAX_PARALLELISM,
+    SERVICE_BULK_ACTION,
+)
+from .coordinator import DockerMonitorCoordinator
+
+try:
+    from homeassistant.core import SupportsResponse
+except ImportError:  # service responses need Home Assistant 2023.7
+    SupportsResponse = None
+
+_LOGGER = logging.getLogger(__name__)
+
+_STRINGS = vol.All(cv.ensure_list, [cv.string])
+
+BULK_ACTION_SCHEMA = vol.All(
+    vol.Schema(
+        {
+            vol.Required(ATTR_ACTION): vol.In(CONTAINER_ACTIONS),
+            vol.Optional(ATTR_NAMES): _STRINGS,
+            vol.Optional(ATTR_LABELS): _STRINGS,
+            vol.Optional(ATTR_COMPOSE_PROJECTS): _STRINGS,
+            vol.Optional(ATTR_PARALLELISM, default=DEFAULT_PARALLELISM): vol.All(
+                vol.Coerce(int), vol.Range(min=1, max=MAX_PARALLELISM)
+            ),
+            vol.Optional(ATTR_TIMEOUT): vol.All(vol.Coerce(int), vol.Range(min=0)),
+            vol.Optional(ATTR_SIGNAL): cv.string,
+        }
+    ),
+    cv.has_at_least_one_key(ATTR_NAMES, ATTR_LABELS, ATTR_COMPOSE_PROJECTS),
+)
+
+
+def _action_kwargs(data: dict[str, Any]) -> dict[str, Any]:
+    """Return the engine client arguments of the action."""
+    if data[ATTR_ACTION] in ("stop", "restart") and ATTR_TIMEOUT in data:
+        return {"timeout": data[ATTR_TIMEOUT]}
+    if data[ATTR_ACTION] == "kill" and ATTR_SIGNAL in data:
+        return {"signal": data[ATTR_SIGNAL]}
+    return {}
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the services of the integration."""
+
+    async def async_bulk_action(call: ServiceCall) -> dict[str, Any] | None:
+        """Run an action on the matching containers of all hosts, in parallel.
+
+        At most parallelism actions run at once, the result of each container is
+        fired in an event and returned when the caller asks for a response.
+        """
+        action = call.data[ATTR_ACTION]
+        kwargs = _action_kwargs(call.data)
+        targets: list[tuple[DockerMonitorCoordinator, str]] = [
+            (coordinator, name)
+            for entry_data in hass.data.get(DOMAIN, {}).values()
+            if HUB in entry_data
+            for coordinator in entry_data[HUB].coordinators
+            for name in coordinator.find_containers(
+                call.data.get(ATTR_NAMES, ()),
+                call.data.get(ATTR_LABELS, ()),
+                call.data.get(ATTR_COMPOSE_PROJECTS, ()),
+            )
+        ]
+        semaphore = asyncio.Semaphore(call.data[ATTR_PARALLELISM])
+
+        async def run(coordinator: DockerMonitorCoordinator, name: str) -> dict:
+            result: dict[str, Any] = {"host": coordinator.url, "container": name}
+            async with semaphore:
+                try:
+                    await coordinator.container_action(name, action, **kwargs)
+                except HomeAssistantError as err:
+                    return {**result, "success": False, "error": str(err)}
+            return {**result, "success": True}
+
+        _LOGGER.debug("Running %s on %s containers", action, len(targets))
+        results = await asyncio.gather(*(run(*target) for target in targets))
+        if failed := [r for r in results if not r["success"]]:
+            _LOGGER.warning(
+                "%s failed on %s",
+                action,
+                ", ".join(f"{r['container']} ({r['error']})" for r in failed),
+            )
+        hass.bus.async_fire(EVENT_BULK_ACTION, {"action": action, "results": results})
+        if getattr(call, "return_response", False):
+            return {"results": results}
+        return None
+
+    kwargs: dict[str, Any] = {}
+    if SupportsResponse is not None:
+        kwargs["supports_response"] = SupportsResponse.OPTIONAL
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_BULK_ACTION,
+        async_bulk_action,
+        schema=BULK_ACTION_SCHEMA,
+        **kwargs,
+    )
@@ -0,0 +1,139 @@
+"""Rolling-window aggregates of container metrics."""
+from __future__ import annotations
+
+from bisect import bisect_left, insort
+from collections import deque
+import math
+from typing import Any
+
+# samples kept per window, older ones are dropped even if still in the window
+MAX_WINDOW_SAMPLES = 1000
+
+
+class RollingWindow:
+    """Min, max, mean and 95th percentile of the values of the last seconds.
+
+    Min and max come from monotonic queues and the mean from a running sum, in
+    amortized O(1). The percentile is read from a sorted copy of the values, found
+    in O(log n) but inserted and removed in O(n), n being at most
+    MAX_WINDOW_SAMPLES.
+    """
+
+    __slots__ = ("_duration", "_values", "_sorted", "_min", "_max", "_sum", "_seq")
+
+    def __init__(self, duration: float) -> None:
+        """Init."""
+        self._duration = duration
+        # (sequence, time, value) in arrival order
+        self._values: deque[tuple[int, float, float]] = deque()
+        self._sorted: list[float] = []
+        # (sequence, value), increasing for _min and decreasing for _max
+        self._min: deque[tuple[int, float]] = deque()
+        self._max: deque[tuple[int, float]] = deque()
+        self._sum = 0.0
+        self._seq = 0
+
+    def __len__(self) -> int:
+        """Return the number of values in the window."""
+        return len(self._values)
+
+    def add(self, time: float, value: float) -> None:
+        """Add the value measured at time, expiring the values out of the window."""
+        if len(self._values) >= MAX_WINDOW_SAMPLES:
+            self._pop()
+        self._seq += 1
+        self._values.append((self._seq, time, value))
+        insort(self._sorted, value)
+        self._sum += value
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((self._seq, value))
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((self._seq, value))
+        self.expire(time)
+
+    def expire(self, now: float) -> None:
+        """Drop the values older than the window."""
+        while self._values and self._values[0][1] <= now - self._duration:
+            self._pop()
+
+    def _pop(self) -> None:
+        seq, _, value = self._values.popleft()
+        del self._sorted[bisect_left(self._sorted, value)]
+        self._sum -= value
+        if self._min[0][0] == seq:
+            self._min.popleft()
+        if self._max[0][0] == seq:
+            self._max.popleft()
+        if not self._values:
+            # don't let rounding errors accumulate
+            self._sum = 0.0
+
+    @property
+    def min(self) -> float | None:
+        """Return the smallest value."""
+        return self._min[0][1] if self._min else None
+
+    @property
+    def max(self) -> float | None:
+        """Return the largest value."""
+        return self._max[0][1] if self._max else None
+
+    @property
+    def mean(self) -> float | None:
+        """Return the mean of the values."""
+        return self._sum / len(self._values) if self._values else None
+
+    def percentile(self, pct: float) -> float | None:
+        """Return the nearest-rank percentile of the values."""
+        if not self._sorted:
+            return None
+        rank = max(1, math.ceil(pct / 100 * len(self._sorted)))
+        return self._sorted[rank - 1]
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the aggregates."""
+        return {
+            "min": self.min,
+            "max": self.max,
+            "mean": self.mean,
+            "p95": self.percentile(95),
+        }
+
+
+class MetricWindows:
+    """Rolling windows of several durations, in minutes, over one metric."""
+
+    __slots__ = ("_windows",)
+
+    def __init__(self, minutes: list[int]) -> None:
+        """Init."""
+        self._windows = {m: RollingWindow(m * 60) for m in minutes}
+
+    def add(self, time: float, value: float) -> None:
+        """Add the value measured at time to all windows."""
+        for window in self._windows.values():
+            window.add(time, value)
+
+    def expire(self, now: float) -> None:
+        """Drop the values older than their window."""
+        for window in self._windows.values():
+            window.expire(now)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the aggregates of all windows, keyed by their duration."""
+        return {
+            f"{minutes}m": window.as_dict() for minutes, window in self._windows.items()
+        }
+
+
+def parse_windows(value: str) -> list[int]:
+    """Parse window durations in minutes, separated by commas.
+
+    Raise ValueError if a duration isn't a positive number of minutes.
+    """
+    minutes = {int(part) for part in value.split(",") if part.strip()}
+    if any(m <= 0 for m in minutes):
+        raise ValueError(f"Window durations must be positive: {value}")
+    return sorted(minutes)